@@ -1,4 +1,5 @@
 import gamelib
+from gamelib.planner import TurnPlanner
 import random
 import math
 import warnings
@@ -15,19 +16,10 @@ Advanced strategy tips:
   - You can analyze action frames by modifying on_action_frame function
 
   - The GameState.map object can be manually manipulated to create hypothetical 
-  board states. Though, we recommended making a copy of the map to preserve 
-  the actual current map state.
+  board states. Though, we recommended using GameState.fork() to get a cheap 
+  copy and preserve the actual current map state.
 """
 
-def mkT(x, y, upg = False):
-    return [TURRET, [x, y], upg]
-
-def mkW(x, y, upg = False):
-    return [WALL, [x, y], upg]
-
-def mkS(x, y, upg = False):
-    return [SUPPORT, [x, y], upg]
-
 class AlgoStrategy(gamelib.AlgoCore):
     def __init__(self):
         super().__init__()
@@ -41,15 +33,9 @@ class AlgoStrategy(gamelib.AlgoCore):
         """
         gamelib.debug_write('Configuring your custom algo strategy...')
         self.config = config
-        global WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, MP, SP
-        WALL = config["unitInformation"][0]["shorthand"]
-        SUPPORT = config["unitInformation"][1]["shorthand"]
-        TURRET = config["unitInformation"][2]["shorthand"]
-        SCOUT = config["unitInformation"][3]["shorthand"]
-        DEMOLISHER = config["unitInformation"][4]["shorthand"]
-        INTERCEPTOR = config["unitInformation"][5]["shorthand"]
-        MP = 1
-        SP = 0
+        # The unit constants of this game, kept per strategy so several games can share a process
+        self.game_config = gamelib.GameConfig.get(config)
+        mkT, mkW, mkS = self.mkT, self.mkW, self.mkS
 
         # This is a good place to do initial setup
         self.invert = False # whether we are inverted or not
@@ -91,6 +77,21 @@ class AlgoStrategy(gamelib.AlgoCore):
                         mkT(20,9, True)]
         self.sell_extra = [s[1] for s in self.extra]
 
+        self.use_planner = False # whether on_turn searches with the simulator instead of running strategy_v1
+        self.plan_budget = 1.0 # seconds the planner may search each turn
+        self.planner = TurnPlanner(config)
+        self.worker_processes = 0 # processes AlgoCore.start forks for planning, 0 to plan in this process
+        self.parse_action_frames = False # whether action frames are decoded into self.action_frame for on_action_frame
+
+
+    def mkT(self, x, y, upg = False):
+        return [self.game_config.TURRET, [x, y], upg]
+
+    def mkW(self, x, y, upg = False):
+        return [self.game_config.WALL, [x, y], upg]
+
+    def mkS(self, x, y, upg = False):
+        return [self.game_config.SUPPORT, [x, y], upg]
 
     def on_turn(self, turn_state):
         """
@@ -100,13 +101,17 @@ class AlgoStrategy(gamelib.AlgoCore):
         unit deployments, and transmitting your intended deployments to the
         game engine.
         """
-        game_state = gamelib.GameState(self.config, turn_state)
+        game_state = gamelib.GameState(self.config, turn_state, self.turn_state)
         #gamelib.debug_write('Performing turn {} of your custom algo strategy'.format(game_state.turn_number))
         game_state.suppress_warnings(True)  # Comment or remove this line to enable warnings.
 
         #self.starter_strategy(game_state)
-        self.strategy_v1(game_state)
+        if self.use_planner:
+            self.planned_strategy(game_state)
+        else:
+            self.strategy_v1(game_state)
 
+        #gamelib.debug_write('Distance field cache: {}'.format(gamelib.navigation.DISTANCE_FIELD_CACHE.stats()))
         game_state.submit_turn()
 
 
@@ -150,25 +155,25 @@ class AlgoStrategy(gamelib.AlgoCore):
         self.build_defenses_v1(game_state)
 
         # Offense
-        mp_available = game_state.get_resource(MP)
+        mp_available = game_state.get_resource(game_state.MP)
         if (game_state.turn_number < 4):
-            game_state.attempt_spawn(INTERCEPTOR, self.get_normalized_point([2,11]), 1)
+            game_state.attempt_spawn(self.game_config.INTERCEPTOR, self.get_normalized_point([2,11]), 1)
         if (game_state.turn_number <= 20 and (game_state.turn_number <= 10 or game_state.turn_number%2)):
-            game_state.attempt_spawn(DEMOLISHER, self.get_normalized_point([20, 6]), math.floor(mp_available))
+            game_state.attempt_spawn(self.game_config.DEMOLISHER, self.get_normalized_point([20, 6]), math.floor(mp_available))
         elif (False):
             self.refing = True
             self.refres = self.reflect(game_state)
         elif (self.attack):
             if random.getrandbits(1):
-                game_state.attempt_spawn(SCOUT, self.get_normalized_points([[13,0], [11,2]]), math.floor(mp_available * 0.5))
+                game_state.attempt_spawn(self.game_config.SCOUT, self.get_normalized_points([[13,0], [11,2]]), math.floor(mp_available * 0.5))
             else:
-                game_state.attempt_spawn(DEMOLISHER, self.get_normalized_point([13, 0]), math.floor(mp_available))
+                game_state.attempt_spawn(self.game_config.DEMOLISHER, self.get_normalized_point([13, 0]), math.floor(mp_available))
             self.attack = False
             self.sell_diag(game_state)
         elif ((mp_available > 15 and game_state.turn_number < 30) or (mp_available > 21)):
             self.attack = True
             self.repl = []
-            sp = game_state.get_resource(SP)
+            sp = game_state.get_resource(game_state.SP)
             for d in self.diag:
                 if sp > 3:
                     self.repl.append(d)
@@ -179,6 +184,27 @@ class AlgoStrategy(gamelib.AlgoCore):
                 self.sell_diag(game_state)
             game_state.attempt_remove(self.sell_extra)
 
+    def planned_strategy(self, game_state):
+        """
+        Lets the planner pick a build order and deploy by simulating candidates
+        for at most self.plan_budget seconds
+        """
+        build_sets = [
+            self.base_v,
+            self.base_v + self.wall_v[0] + self.reinf[0],
+            self.base_v + self.wall_v[1] + self.reinf[1],
+            self.base_v + self.wall_v[0] + self.wall_v[1] + self.reinf[0] + self.reinf[1] + (
+                self.rightTU + self.reinfU[0] + self.reinfU[1] + self.wall_vU[0] + self.wall_vU[1]),
+        ]
+        build_sets = [[[s[0], self.get_normalized_point(list(s[1])), s[2]] for s in build_set] for build_set in build_sets]
+
+        if self.worker_pool:
+            plan = self.worker_pool.plan(game_state, build_sets, self.plan_budget)
+        else:
+            plan = self.planner.plan(game_state, build_sets, self.plan_budget)
+        plan.apply(game_state)
+        self.fix_front_row(game_state)
+
     def fix_front_row(self, game_state):
         for i in range(28):
             loc = [i,13]
@@ -202,19 +228,17 @@ class AlgoStrategy(gamelib.AlgoCore):
         self.fix_front_row(game_state)
 
         # [TYPE, point[2], upgrade]
-        for struct in build_order:
-            loc = self.get_normalized_point(struct[1])
-            game_state.attempt_spawn(struct[0], loc)
-            if (struct[2]):
-                game_state.attempt_upgrade(loc)
+        game_state.apply_build_plan([[struct[0], self.get_normalized_point(struct[1]), struct[2]] for struct in build_order])
 
         if self.attack:
             if self.repl:
-                game_state.attempt_spawn(SUPPORT, self.repl)
+                game_state.attempt_spawn(self.game_config.SUPPORT, self.repl)
             shift = -1
             while True:
                 shift = shift + 1
                 succ = 1
+                #Place a whole diagonal or none of it
+                checkpoint = game_state.checkpoint()
                 for p in self.diag:
                     loc = [p[0] - shift, p[1]]
                     if p[1] < 7:
@@ -223,15 +247,18 @@ class AlgoStrategy(gamelib.AlgoCore):
                     nloc = self.get_normalized_point(loc)
                     unit = game_state.contains_stationary_unit(nloc)
                     if not unit:
-                        succ = game_state.attempt_spawn(SUPPORT, nloc)
+                        succ = game_state.attempt_spawn(self.game_config.SUPPORT, nloc)
                     if succ:
                         game_state.attempt_remove(nloc)
-                    if p[1] >= 7 and (not unit or unit.unit_type == SUPPORT):
+                    if p[1] >= 7 and (not unit or unit.unit_type == self.game_config.SUPPORT):
                         succ = game_state.attempt_upgrade(nloc)
                     if not succ:
                         break
                 if not succ:
+                    game_state.rollback(checkpoint)
+                    game_state.release(checkpoint)
                     break
+                game_state.release(checkpoint)
 
 
     def on_action_frame(self, turn_string):
@@ -242,13 +269,13 @@ class AlgoStrategy(gamelib.AlgoCore):
         Full doc on format of a game frame at in json-docs.html in the root of the Starterkit.
         """
         # Let's record at what position we get scored on
-        #state = json.loads(turn_string)
+        #state = self.action_frame # set parse_action_frames in on_game_start first
 
     def reflect(self, game_state):
         ref = {}
         old = []
 
-        for location in game_state.game_map:
+        for location in game_state.game_map.get_structure_locations():
             if location[1] > 13:
                 continue
 
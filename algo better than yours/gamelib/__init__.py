@@ -10,12 +10,34 @@ Investigating it is useful for any player that wants to access more information
 The GameUnit class in unit.py represetns a single unit. 
 Investigating it is useful for any player that wants to access information about units. \n
 
+The GameConfig class in game_config.py holds the unit constants and UnitSpec stats read from a config, once per config.
+GameState, GameMap and GameUnit share it instead of module globals, so several games or configs can live in one process. \n
+
+geometry.py holds the arena's shape as flat tables indexed by x * 28 + y, computed once at import: the bounds mask, edges, neighbors, distances and tiles in range.
+GameMap, navigation, the simulator and the threat map read them instead of recomputing them. \n
+
 The AlgoCore class in algocore.py handles communication with the game engine, and forms the bones of an algo. AlgoStrategy inherits from it. 
 Investigating it is useful for advanced players interested in getting data from the action phase or communicating directly with the game engine. \n
 
 The Navigation class in navigation.py contains functions related to pathfinding, which are used by GameState in pathing related functions. 
 Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. \n 
 
+The BoardArrays class in board_arrays.py is an optional NumPy view of a GameMap, available through GameMap.get_board_arrays() when numpy is installed.
+It is useful for players who want whole board statistics without looping over every tile. \n
+
+The ThreatMap class in threat_map.py tracks the damage per frame structures deal to mobile units on every tile.
+GameState.get_threat_map() keeps one in sync with the board, which makes scoring paths cheap. \n
+
+The ActionPhaseSimulator class in simulator.py plays out the action phase following a GameState, pending builds and deploys included.
+It returns the health, SP and MP changes and the structures destroyed, which lets an algo compare candidate turns. \n
+
+The TurnPlanner class in planner.py searches candidate builds and deploys with the simulator and returns the best it finds within a time budget. \n
+
+The BoardSnapshot class in snapshot.py packs a GameState's units and stats into about a kilobyte, made by GameState.snapshot().
+Snapshots hash by content and can rebuild a GameState, which makes them cheap to send between processes or use as cache keys. \n
+
+The WorkerPool class in worker_pool.py splits a TurnPlanner search across processes forked once per game. Set AlgoCore.worker_processes in on_game_start to use one. \n
+
 util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write().
 """
 
@@ -24,6 +46,7 @@ from .util import debug_write
 from .game_state import GameState
 from .unit import GameUnit
 from .game_map import GameMap
+from .game_config import GameConfig
 
-__all__ = ["algocore", "game_state", "game_map", "navigation", "unit", "util"]
+__all__ = ["algocore", "board_arrays", "game_config", "game_state", "game_map", "geometry", "navigation", "planner", "simulator", "snapshot", "threat_map", "unit", "util", "worker_pool"]
  
\ No newline at end of file
@@ -2,6 +2,30 @@ import json
 
 from .game_state import GameState
 from .util import get_command, debug_write, BANNER_TEXT, send_command
+from .worker_pool import WorkerPool
+
+
+def _turn_info(message):
+    """Reads the turnInfo list out of a game engine message without decoding the rest of it
+
+    Args:
+        message: A message from the game engine
+
+    Returns:
+        turnInfo as a list of ints, or None if the message has none
+
+    """
+    start = message.find('"turnInfo"')
+    if start < 0:
+        return None
+    start = message.find("[", start)
+    end = message.find("]", start)
+    try:
+        return [int(value) for value in message[start + 1:end].split(",")]
+    except ValueError:
+        #Not the compact form the engine sends, decode it properly
+        return [int(value) for value in json.loads(message)["turnInfo"]]
+
 
 class AlgoCore(object):
     """
@@ -10,10 +34,22 @@ class AlgoCore(object):
 
     Attributes :
         * config (JSON): json object containing information about the game
+        * worker_processes (int): Set it in on_game_start to start a WorkerPool of this many processes, 0 for none
+        * worker_pool (WorkerPool): The pool started after on_game_start, None if worker_processes is 0
+        * turn_state (dict): The last turn message decoded from JSON. Pass it to GameState with the
+          string given to on_turn so the message is not decoded twice
+        * parse_action_frames (bool): Set it in on_game_start to have each action frame decoded into action_frame
+          before on_action_frame is called. Otherwise frames are passed on without being decoded
+        * action_frame (dict): The last action frame decoded from JSON, None unless parse_action_frames is set
 
     """
     def __init__(self):
         self.config = None
+        self.worker_processes = 0
+        self.worker_pool = None
+        self.turn_state = None
+        self.parse_action_frames = False
+        self.action_frame = None
 
     def on_game_start(self, config):
         """
@@ -63,25 +99,32 @@ class AlgoCore(object):
                 """
                 parsed_config = json.loads(game_state_string)
                 self.on_game_start(parsed_config)
+                if self.worker_processes:
+                    self.worker_pool = WorkerPool(parsed_config, self.worker_processes)
             elif "turnInfo" in game_state_string:
-                state = json.loads(game_state_string)
-                stateType = int(state.get("turnInfo")[0])
+                #Only turnInfo is read here, whole messages are decoded only when they are used
+                stateType = _turn_info(game_state_string)[0]
                 if stateType == 0:
                     """
                     This is the game turn game state message. Algo must now print to stdout 2 lines, one for build phase one for
                     deploy phase. Printing is handled by the provided functions.
                     """
+                    self.turn_state = json.loads(game_state_string)
                     self.on_turn(game_state_string)
                 elif stateType == 1:
                     """
                     If stateType == 1, this game_state_string string represents a single frame of an action phase
                     """
+                    if self.parse_action_frames:
+                        self.action_frame = json.loads(game_state_string)
                     self.on_action_frame(game_state_string)
                 elif stateType == 2:
                     """
                     This is the end game message. This means the game is over so break and finish the program.
                     """
                     debug_write("Got end state, game over. Stopping algo.")
+                    if self.worker_pool:
+                        self.worker_pool.close()
                     break
                 else:
                     """
@@ -0,0 +1,130 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .geometry import ARENA_SIZE, IN_BOUNDS
+from .game_config import GameConfig
+
+NO_UNIT = -1
+
+
+class BoardArrays:
+    """Optional NumPy view of the structures on a GameMap, kept in sync with the GameUnit objects.
+
+    Every array is indexed [x, y] like the map itself. GameMap.get_board_arrays builds one and
+    registers it as a listener, so add_unit, remove_unit, item assignment and update_tile keep it current.
+    Whole board questions are then answered with vectorized operations instead of walking the map.
+
+    Attributes :
+        * structure_type (ndarray): The unitInformation index of the structure on each tile, -1 if empty
+        * owner (ndarray): The player index owning the structure on each tile, -1 if empty
+        * health (ndarray): The health of the structure on each tile
+        * upgraded (ndarray): True where the structure is upgraded
+        * pending_removal (ndarray): True where the structure is flagged for removal
+        * in_bounds (ndarray): True for every tile on the diamond shaped board
+
+    """
+    def __init__(self, config, game_map=None):
+        """Builds the arrays, reading every tile of game_map if one is given
+
+        Args:
+            config (JSON): Contains information about the game, or its GameConfig
+            game_map: The GameMap to copy structures from
+
+        """
+        if np is None:
+            raise ImportError("BoardArrays requires numpy")
+        shape = (ARENA_SIZE, ARENA_SIZE)
+        self.structure_type = np.full(shape, NO_UNIT, dtype=np.int8)
+        self.owner = np.full(shape, NO_UNIT, dtype=np.int8)
+        self.health = np.zeros(shape, dtype=np.float64)
+        self.upgraded = np.zeros(shape, dtype=bool)
+        self.pending_removal = np.zeros(shape, dtype=bool)
+        #IN_BOUNDS is indexed x * ARENA_SIZE + y, so it reshapes straight to [x, y]
+        self.in_bounds = np.frombuffer(IN_BOUNDS, dtype=np.uint8).reshape(ARENA_SIZE, ARENA_SIZE).astype(bool)
+
+        #Per type stats, indexed [unitInformation index, upgraded]
+        game_config = GameConfig.get(config)
+        unit_information = game_config.config["unitInformation"]
+        self._type_index = game_config.UNIT_TYPE_TO_INDEX
+        stats_shape = (len(unit_information), 2)
+        self._damage_i = np.zeros(stats_shape)
+        self._attack_range = np.zeros(stats_shape)
+        self._cost = np.zeros(stats_shape)
+        for index, type_config in enumerate(unit_information):
+            upgrade = type_config.get("upgrade", {})
+            self._damage_i[index] = [type_config.get("attackDamageWalker", 0), upgrade.get("attackDamageWalker", type_config.get("attackDamageWalker", 0))]
+            self._attack_range[index] = [type_config.get("attackRange", 0), upgrade.get("attackRange", type_config.get("attackRange", 0))]
+            base_cost = type_config.get("cost1", 0)
+            self._cost[index] = [base_cost, base_cost + upgrade.get("cost1", 0)]
+
+        if game_map is not None:
+            xs, ys = np.nonzero(self.in_bounds)
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                self.tile_changed(x, y, game_map[x, y])
+
+    def tile_changed(self, x, y, units):
+        """GameMap listener callback, copies the structure now at [x, y] into the arrays
+        """
+        for unit in units:
+            if unit.stationary:
+                self.structure_type[x, y] = self._type_index[unit.unit_type]
+                self.owner[x, y] = unit.player_index
+                self.health[x, y] = unit.health
+                self.upgraded[x, y] = unit.upgraded
+                self.pending_removal[x, y] = unit.pending_removal
+                return
+        self.structure_type[x, y] = NO_UNIT
+        self.owner[x, y] = NO_UNIT
+        self.health[x, y] = 0
+        self.upgraded[x, y] = False
+        self.pending_removal[x, y] = False
+
+    def structure_mask(self, player_index, unit_type=None):
+        """Gets a boolean array of the tiles holding structures of a player
+
+        Args:
+            player_index: The index corresponding to the player, 0 for you 1 for the enemy
+            unit_type: Only match structures of this type if given
+
+        """
+        mask = self.owner == player_index
+        if unit_type is not None:
+            mask &= self.structure_type == self._type_index[unit_type]
+        return mask
+
+    def structure_count(self, player_index, unit_type=None):
+        """Counts the structures a player has on the board, optionally only of one type
+        """
+        return int(np.count_nonzero(self.structure_mask(player_index, unit_type)))
+
+    def structure_value(self, player_index):
+        """The SP a player has spent on the structures currently on the board, upgrades included
+        """
+        mask = self.structure_mask(player_index)
+        return float(self._cost[self.structure_type[mask], self.upgraded[mask].astype(np.int8)].sum())
+
+    def turret_damage(self, player_index):
+        """Gets the damage per frame a player's structures deal to a mobile unit standing on each tile.
+        Uses the same range test as GameState.get_attackers, with upgraded range and damage.
+
+        Args:
+            player_index: The index corresponding to the attacking player, 0 for you 1 for the enemy
+
+        Returns:
+            A float array indexed [x, y], 0 outside the arena
+
+        """
+        xs, ys = np.nonzero(self.structure_mask(player_index))
+        types = self.structure_type[xs, ys]
+        upgraded = self.upgraded[xs, ys].astype(np.int8)
+        damage = self._damage_i[types, upgraded]
+        attack_range = self._attack_range[types, upgraded]
+        armed = damage > 0
+        xs, ys, damage, attack_range = xs[armed], ys[armed], damage[armed], attack_range[armed]
+
+        grid_x, grid_y = np.indices((ARENA_SIZE, ARENA_SIZE))
+        distance_squared = (grid_x[None] - xs[:, None, None]) ** 2 + (grid_y[None] - ys[:, None, None]) ** 2
+        in_range = distance_squared <= (attack_range ** 2)[:, None, None]
+        return (in_range * damage[:, None, None]).sum(axis=0) * self.in_bounds
@@ -0,0 +1,133 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+
+class UnitSpec(namedtuple("UnitSpec", ["unit_type", "index", "upgraded", "stationary", "speed", "damage_f", "damage_i", "attackRange",
+                                         "shieldRange", "max_health", "shieldPerUnit", "shieldBonusPerY", "cost", "upgrade"])):
+    """The fixed stats of a unit type, upgraded or not, shared by every GameUnit of that type. See GameConfig.unit_specs
+
+    Attributes :
+        * unit_type (string): The unit type
+        * index (int): The unitInformation index of the type times 2, plus 1 if upgraded
+        * upgraded (bool): If these are the upgraded stats
+        * cost ((int, int)): The total cost, including any upgrade, first is SP second is MP
+        * upgrade (UnitSpec): The upgraded stats of the type, None if these are already upgraded
+        * The rest are as described in GameUnit
+
+    """
+    __slots__ = ()
+
+
+# The unitInformation keys of speed, damage_f, damage_i, attackRange, shieldRange, max_health, shieldPerUnit and shieldBonusPerY
+_STAT_NAMES = ["speed", "attackDamageTower", "attackDamageWalker", "attackRange", "shieldRange", "startHealth", "shieldPerUnit", "shieldBonusPerY"]
+
+# GameConfig for each id(config), holding on to at most _MAX_CACHED_CONFIGS configs
+_game_configs = {}
+_MAX_CACHED_CONFIGS = 16
+
+
+class GameConfig:
+    """The constants of a game's config, read once and never changed, shared by the GameState, GameMap and GameUnits of the game.
+
+    Nothing here is global, so one process can hold states of several games or configs at once.
+    Use GameConfig.get rather than the constructor to share one context per config.
+
+    Attributes :
+        * config (JSON): The config the constants were read from
+        * WALL (str): A constant representing the wall unit
+        * SUPPORT (str): A constant representing the support unit
+        * TURRET (str): A constant representing the turret unit
+        * SCOUT (str): A constant representing the scout unit
+        * DEMOLISHER (str): A constant representing the demolisher unit
+        * INTERCEPTOR (str): A constant representing the interceptor unit
+        * REMOVE (str): A constant representing removing your own unit
+        * UPGRADE (str): A constant representing upgrading a unit
+        * UNIT_TYPE_TO_INDEX (mapping): Maps a unit to its unitInformation index
+        * STRUCTURE_TYPES (tuple): The structure units
+        * ALL_UNITS (tuple): The mobile units, then the structure units
+        * MP (int): A constant representing the Mobile Points resource, used in the get_resource function
+        * SP (int): A constant representing the SP resource, used in the get_resource function
+        * unit_specs (mapping): Maps every structure and mobile unit to the UnitSpec of its stats, whose upgrade is the upgraded UnitSpec
+
+    """
+    __slots__ = ("config", "WALL", "SUPPORT", "TURRET", "SCOUT", "DEMOLISHER", "INTERCEPTOR", "REMOVE", "UPGRADE",
+                 "UNIT_TYPE_TO_INDEX", "STRUCTURE_TYPES", "ALL_UNITS", "MP", "SP", "unit_specs")
+
+    def __init__(self, config):
+        """Reads the constants out of config
+
+        Args:
+            config (JSON): Contains information about the game
+
+        """
+        unit_information = config["unitInformation"]
+        unit_types = [unit_information[index]["shorthand"] for index in range(8)]
+        WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, REMOVE, UPGRADE = unit_types
+        self.__set(config=config, WALL=WALL, SUPPORT=SUPPORT, TURRET=TURRET, SCOUT=SCOUT, DEMOLISHER=DEMOLISHER,
+                   INTERCEPTOR=INTERCEPTOR, REMOVE=REMOVE, UPGRADE=UPGRADE,
+                   UNIT_TYPE_TO_INDEX=MappingProxyType({unit_type: index for index, unit_type in enumerate(unit_types)}),
+                   STRUCTURE_TYPES=(WALL, SUPPORT, TURRET), ALL_UNITS=(SCOUT, DEMOLISHER, INTERCEPTOR, WALL, SUPPORT, TURRET),
+                   MP=1, SP=0, unit_specs=MappingProxyType(self.__read_unit_specs(unit_information)))
+
+    @classmethod
+    def get(cls, config):
+        """Gets the GameConfig of a config, reading it only the first time
+
+        Args:
+            config: The config JSON, or a GameConfig which is returned as is
+
+        Returns:
+            The GameConfig
+
+        """
+        if isinstance(config, GameConfig):
+            return config
+        cached = _game_configs.get(id(config))
+        if cached is not None and cached.config is config:
+            return cached
+        if len(_game_configs) >= _MAX_CACHED_CONFIGS:
+            _game_configs.clear()
+        game_config = _game_configs[id(config)] = cls(config)
+        return game_config
+
+    def is_stationary(self, unit_type):
+        """
+            Args:
+                unit_type: A unit type
+
+            Returns:
+                Boolean, True if the unit is stationary, False otherwise.
+        """
+        return unit_type in self.STRUCTURE_TYPES
+
+    def __read_unit_specs(self, unit_information):
+        specs = {}
+        for type_index, type_config in enumerate(unit_information):
+            if "unitCategory" not in type_config:
+                continue
+            stats = [type_config.get(name, 0) for name in _STAT_NAMES]
+            cost = (type_config.get("cost1", 0), type_config.get("cost2", 0))
+            upgrade_config = type_config.get("upgrade", {})
+            upgraded_stats = [upgrade_config.get(name, stat) for name, stat in zip(_STAT_NAMES, stats)]
+            upgraded_cost = (cost[0] + upgrade_config.get("cost1", 0), cost[1] + upgrade_config.get("cost2", 0))
+            stationary = type_config["unitCategory"] == 0
+            unit_type = type_config["shorthand"]
+            upgrade = UnitSpec(unit_type, type_index * 2 + 1, True, stationary, *upgraded_stats, upgraded_cost, None)
+            specs[unit_type] = UnitSpec(unit_type, type_index * 2, False, stationary, *stats, cost, upgrade)
+        return specs
+
+    def __set(self, **constants):
+        for name, value in constants.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameConfig is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("GameConfig is immutable")
+
+    def __reduce__(self):
+        return (GameConfig.get, (self.config,))
+
+    def __repr__(self):
+        return "GameConfig({})".format(", ".join(self.ALL_UNITS))
@@ -1,6 +1,30 @@
+import copy
 import math
+import random
+from array import array
 from .unit import GameUnit
+from .game_config import GameConfig
 from .util import debug_write
+from .geometry import ARENA_SIZE, NUM_TILES, TILE_X, TILE_Y, IN_BOUNDS, IN_BOUNDS_INDICES, EDGE_LOCATIONS, in_arena_bounds, tiles_in_range
+
+# Zobrist keys are reserved for this many unitInformation indices
+_ZOBRIST_TYPES = 8
+
+
+def _zobrist_keys(seed=2021):
+    """Random 64 bit keys for every (tile, unitInformation index, owner, upgraded), seeded so hashes agree across processes
+    """
+    generator = random.Random(seed)
+    return array('Q', [generator.getrandbits(64) for _ in range(NUM_TILES * _ZOBRIST_TYPES * 4)])
+
+
+_ZOBRIST_KEYS = _zobrist_keys()
+
+# Sorts tile indices row by row from the bottom, the order GameMap iterates in
+def _row_order(index):
+    return TILE_Y[index] * ARENA_SIZE + TILE_X[index]
+
+_ROW_ORDER_INDICES = tuple(sorted(IN_BOUNDS_INDICES, key=_row_order))
 
 class GameMap:
     """Holds data about the current game map and provides functions
@@ -11,6 +35,7 @@ class GameMap:
 
     Attributes :
         * config (JSON): Contains information about the current game rules
+        * game_config (GameConfig): The constants of config, shared with the map's units
         * enable_warnings (bool): If true, debug messages for game_map functions will print out
         * ARENA_SIZE (int): The size of the arena.
         * HALF_ARENA (int): Half of the size of the arena.
@@ -18,16 +43,23 @@ class GameMap:
         * TOP_LEFT (int): A constant that represents the top left edge
         * BOTTOM_LEFT (int): Hidden challenge! Can you guess what this constant represents???
         * BOTTOM_RIGHT (int): A constant that represents the bottom right edge
+        * zobrist_hash (int): A 64 bit hash of the structures on the map, their type, owner and upgrade.
+          Kept up to date by add_unit, remove_unit, item assignment and update_tile, so equal boards hash equal
+
+    Iterating over the map yields every [x, y] location in the arena, row by row from the bottom.
+    get_structure_locations and get_structure_indices give just the tiles holding structures, and
+    get_mobile_indices the tiles holding mobile units, from indices kept in sync the same way as zobrist_hash.
 
     """
     def __init__(self, config):
         """Initializes constants and game map
 
         Args:
-            config (JSON): Contains information about the game
+            config (JSON): Contains information about the game, or its GameConfig
 
         """
-        self.config = config
+        self.game_config = GameConfig.get(config)
+        self.config = config = self.game_config.config
         self.enable_warnings = True
         self.ARENA_SIZE = 28
         self.HALF_ARENA = int(self.ARENA_SIZE / 2)
@@ -36,44 +68,327 @@ class GameMap:
         self.BOTTOM_LEFT = 2
         self.BOTTOM_RIGHT = 3
         self.__map = self.__empty_grid()
-        self.__start = [13,0]
+        #Columns and tiles this map may change in place, the rest are shared with forks
+        self.__owned_columns = bytearray(b'\x01') * self.ARENA_SIZE
+        self.__owned_tiles = bytearray(b'\x01') * NUM_TILES
+        self.__listeners = []
+        self.__board_arrays = None
+        self.__hit_radius = config["unitInformation"][0]['getHitRadius']
+        self.__type_index = self.game_config.UNIT_TYPE_TO_INDEX
+        self.__tile_keys = array('Q', [0]) * NUM_TILES
+        self.zobrist_hash = 0
+        #The owner of the structure on each tile plus 1, 0 if there is none, and the structure tile indices of each player
+        self.__tile_owners = bytearray(NUM_TILES)
+        self.__structure_tiles = [set(), set()]
+        #Tile indices holding at least one mobile unit
+        self.__mobile_tiles = set()
+        #(columns, journal length, zobrist hash) for each open checkpoint, and (tile index, old key, old owner) per change since the first
+        self.__checkpoints = []
+        self.__journal = []
+        #[unit_type, player_index, health, upgraded, pending_removal] entries by tile index, made into GameUnits when the tile is first read
+        self.__pending = {}
     
     def __getitem__(self, location):
         if len(location) == 2 and self.in_arena_bounds(location):
             x,y = location
+            if self.__pending and x * self.ARENA_SIZE + y in self.__pending:
+                return self.__materialize(x, y)
             return self.__map[x][y]
         self._invalid_coordinates(location)
 
     def __setitem__(self, location, val):
         if type(location) == tuple and len(location) == 2 and self.in_arena_bounds(location):
+            self.__own_column(location[0])
+            self.__pending.pop(location[0] * self.ARENA_SIZE + location[1], None)
             self.__map[location[0]][location[1]] = val
+            self.__owned_tiles[location[0] * self.ARENA_SIZE + location[1]] = 1
+            self.__tile_changed(location[0], location[1])
             return
         self._invalid_coordinates(location)
 
     def __iter__(self):
-        self.__start = [13,0]
-        return self
-    
-    def __next__(self):
-        location = self.__start
-        if location == [15,27]:
-            raise StopIteration
-        new_location = [location[0]+1, location[1]]
-        while not self.in_arena_bounds(new_location) and not location == [14,27]:
-            if new_location[0] == self.ARENA_SIZE:
-                new_location = [0, new_location[1]+1]
-            else:
-                new_location = [new_location[0]+1, new_location[1]]
-        self.__start = new_location
-        return location 
+        for index in _ROW_ORDER_INDICES:
+            yield [TILE_X[index], TILE_Y[index]]
+
+    def get_structure_indices(self, player_index=None):
+        """Gets the tiles holding a structure without looking at any other tile
+
+        Args:
+            player_index: The owner of the structures, 0 for you 1 for the enemy. Both if None
+
+        Returns:
+            A new set of tile indices, x * ARENA_SIZE + y
+
+        """
+        if player_index is None:
+            return self.__structure_tiles[0] | self.__structure_tiles[1]
+        return set(self.__structure_tiles[player_index])
+
+    def get_mobile_indices(self):
+        """Gets the tiles holding at least one mobile unit without looking at any other tile
+
+        Returns:
+            A new set of tile indices, x * ARENA_SIZE + y
+
+        """
+        return set(self.__mobile_tiles)
+
+    def get_structure_locations(self, player_index=None):
+        """Gets the locations holding a structure, in the same order as iterating over the map
+
+        Args:
+            player_index: The owner of the structures, 0 for you 1 for the enemy. Both if None
+
+        Returns:
+            A list of [x, y] locations
+
+        """
+        return [[TILE_X[index], TILE_Y[index]] for index in sorted(self.get_structure_indices(player_index), key=_row_order)]
 
     def __empty_grid(self):
-        grid = []
-        for x in range(0, self.ARENA_SIZE):
-            grid.append([])
-            for _ in range(0, self.ARENA_SIZE):
-                grid[x].append([])
-        return grid
+        return [[[] for _ in range(self.ARENA_SIZE)] for _ in range(self.ARENA_SIZE)]
+
+    def add_listener(self, listener):
+        """Registers an object to be told about tile changes.
+
+        listener.tile_changed(x, y, units) is called after add_unit, remove_unit or item assignment
+        changes the units at [x, y]. Appending to the list returned by game_map[x, y] directly bypasses listeners.
+
+        Args:
+            listener: Any object with a tile_changed(x, y, units) method
+
+        """
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stops sending tile changes to a listener registered with add_listener
+        """
+        if listener in self.__listeners:
+            self.__listeners.remove(listener)
+
+    def update_tile(self, location):
+        """Tells listeners that units at a location were modified in place, for example by GameUnit.upgrade()
+
+        Args:
+            location: The location of the changed units
+
+        """
+        if not self.in_arena_bounds(location):
+            self._invalid_coordinates(location)
+            return
+        self.__tile_changed(location[0], location[1])
+
+    def get_units_for_update(self, location):
+        """Gets the units at a location to modify in place, for example with GameUnit.upgrade().
+        On a forked map the tile is copied first, so the other maps sharing it are unaffected.
+        Call update_tile once the changes are made.
+
+        Args:
+            location: The location of the units
+
+        Returns:
+            The list of units at the location
+
+        """
+        if not self.in_arena_bounds(location):
+            self._invalid_coordinates(location)
+            return
+        return self.__own_tile(location[0], location[1])
+
+    def fork(self):
+        """Makes a copy of this map that shares every tile until either map changes it.
+
+        Forking is cheap whatever the number of units. Afterwards each map copies a column, and a tile
+        with its units, the first time it changes them, through add_unit, remove_unit, item assignment
+        or get_units_for_update. Listeners and board arrays stay with this map.
+
+        Returns:
+            The new GameMap
+
+        """
+        self.__materialize_all()
+        child = copy.copy(self)
+        child.__map = list(self.__map)
+        child.__owned_columns = bytearray(self.ARENA_SIZE)
+        child.__owned_tiles = bytearray(NUM_TILES)
+        child.__listeners = []
+        child.__board_arrays = None
+        child.__tile_keys = array('Q', self.__tile_keys)
+        child.__tile_owners = bytearray(self.__tile_owners)
+        child.__structure_tiles = [set(tiles) for tiles in self.__structure_tiles]
+        child.__mobile_tiles = set(self.__mobile_tiles)
+        child.__checkpoints = []
+        child.__journal = []
+        child.__pending = {}
+        self.__owned_columns = bytearray(self.ARENA_SIZE)
+        self.__owned_tiles = bytearray(NUM_TILES)
+        return child
+
+    def checkpoint(self):
+        """Marks the current board so rollback can return to it.
+
+        Like fork, the columns are shared from here on and copied as they change, so taking a
+        checkpoint is cheap and rolling back costs only the tiles changed since.
+
+        Returns:
+            A checkpoint to pass to rollback or release
+
+        """
+        self.__materialize_all()
+        self.__checkpoints.append((list(self.__map), len(self.__journal), self.zobrist_hash))
+        self.__owned_columns = bytearray(self.ARENA_SIZE)
+        self.__owned_tiles = bytearray(NUM_TILES)
+        return len(self.__checkpoints) - 1
+
+    def rollback(self, checkpoint):
+        """Undoes every change made through the map since a checkpoint, telling listeners about each tile restored.
+        The checkpoint stays open, so it can be rolled back to again. Later checkpoints are released.
+
+        Args:
+            checkpoint: A checkpoint returned by checkpoint()
+
+        """
+        columns, journal_length, zobrist_hash = self.__checkpoints[checkpoint]
+        del self.__checkpoints[checkpoint + 1:]
+        changed = set()
+        for index, key, owner in reversed(self.__journal[journal_length:]):
+            self.__tile_keys[index] = key
+            self.__set_owner(index, owner)
+            changed.add(index)
+        del self.__journal[journal_length:]
+        self.zobrist_hash = zobrist_hash
+        self.__map = list(columns)
+        self.__owned_columns = bytearray(self.ARENA_SIZE)
+        self.__owned_tiles = bytearray(NUM_TILES)
+        for index in sorted(changed):
+            x, y = divmod(index, self.ARENA_SIZE)
+            self.__set_mobile(index, self.__map[x][y])
+            for listener in self.__listeners:
+                listener.tile_changed(x, y, self.__map[x][y])
+
+    def release(self, checkpoint):
+        """Keeps the changes made since a checkpoint and closes it, along with any later checkpoints
+
+        Args:
+            checkpoint: A checkpoint returned by checkpoint()
+
+        """
+        del self.__checkpoints[checkpoint:]
+        if not self.__checkpoints:
+            self.__journal = []
+
+    def _defer_units(self, units):
+        """Places parsed units on empty tiles without building their GameUnits, which are made the first time their
+        tile is read. Used by GameState to parse a turn quickly when only part of the board is looked at.
+
+        Args:
+            units: A dict from tile index to a list of [unit_type, player_index, health, upgraded, pending_removal] entries
+
+        """
+        self.__pending.update(units)
+        if self.__listeners:
+            for index in units:
+                self.__tile_changed(*divmod(index, self.ARENA_SIZE))
+            return
+        structure_types = self.game_config.STRUCTURE_TYPES
+        for index, entries in units.items():
+            for unit_type, player_index, health, upgraded, pending_removal in entries:
+                if unit_type in structure_types:
+                    self.__set_tile(index, _ZOBRIST_KEYS[((index * _ZOBRIST_TYPES + self.__type_index[unit_type]) * 2 + (player_index == 1)) * 2 + upgraded], player_index + 1)
+                    break
+            for entry in entries:
+                if entry[0] not in structure_types:
+                    self.__mobile_tiles.add(index)
+                    break
+
+    def __materialize(self, x, y):
+        index = x * self.ARENA_SIZE + y
+        units = []
+        for unit_type, player_index, health, upgraded, pending_removal in self.__pending.pop(index):
+            unit = GameUnit(unit_type, self.game_config, player_index, health, x, y)
+            if upgraded:
+                unit.upgrade()
+            unit.pending_removal = pending_removal
+            units.append(unit)
+        self.__own_column(x)
+        self.__map[x][y] = units
+        self.__owned_tiles[index] = 1
+        return units
+
+    def __materialize_all(self):
+        for index in list(self.__pending):
+            self.__materialize(*divmod(index, self.ARENA_SIZE))
+
+    def __own_column(self, x):
+        if not self.__owned_columns[x]:
+            self.__map[x] = list(self.__map[x])
+            self.__owned_columns[x] = 1
+
+    def __own_tile(self, x, y):
+        index = x * self.ARENA_SIZE + y
+        if index in self.__pending:
+            return self.__materialize(x, y)
+        if not self.__owned_tiles[index]:
+            self.__own_column(x)
+            self.__map[x][y] = [copy.copy(unit) for unit in self.__map[x][y]]
+            self.__owned_tiles[index] = 1
+        return self.__map[x][y]
+
+    def get_board_arrays(self):
+        """Gets a NumPy view of the structures on this map, for vectorized whole board queries.
+        It is built on first use and kept in sync with add_unit, remove_unit, item assignment and update_tile.
+
+        Returns:
+            The BoardArrays for this map, or None if numpy is not installed
+
+        """
+        if self.__board_arrays is None:
+            #Imported here so algos that never use board arrays don't pay for importing numpy
+            from .board_arrays import BoardArrays, np
+            if np is None:
+                self.warn("numpy is not installed, board arrays are unavailable")
+                return None
+            self.__board_arrays = BoardArrays(self.config, self)
+            self.add_listener(self.__board_arrays)
+        return self.__board_arrays
+
+    def __tile_changed(self, x, y):
+        index = x * self.ARENA_SIZE + y
+        units = self.__materialize(x, y) if index in self.__pending else self.__map[x][y]
+        key = 0
+        owner = 0
+        for unit in units:
+            if unit.stationary:
+                key = _ZOBRIST_KEYS[((index * _ZOBRIST_TYPES + self.__type_index[unit.unit_type]) * 2 + (unit.player_index == 1)) * 2 + unit.upgraded]
+                owner = unit.player_index + 1
+                break
+        self.__set_tile(index, key, owner)
+        self.__set_mobile(index, units)
+        for listener in self.__listeners:
+            listener.tile_changed(x, y, units)
+
+    def __set_mobile(self, index, units):
+        for unit in units:
+            if not unit.stationary:
+                self.__mobile_tiles.add(index)
+                return
+        self.__mobile_tiles.discard(index)
+
+    def __set_tile(self, index, key, owner):
+        if self.__checkpoints:
+            self.__journal.append((index, self.__tile_keys[index], self.__tile_owners[index]))
+        self.zobrist_hash ^= self.__tile_keys[index] ^ key
+        self.__tile_keys[index] = key
+        self.__set_owner(index, owner)
+
+    def __set_owner(self, index, owner):
+        old_owner = self.__tile_owners[index]
+        if old_owner != owner:
+            if old_owner:
+                self.__structure_tiles[old_owner - 1].discard(index)
+            if owner:
+                self.__structure_tiles[owner - 1].add(index)
+            self.__tile_owners[index] = owner
 
     def _invalid_coordinates(self, location):
         self.warn("{} is out of bounds.".format(str(location)))
@@ -89,19 +404,9 @@ class GameMap:
         
         """
         x, y = location
-        half_board = self.HALF_ARENA
-
-        row_size = y + 1
-        startx = half_board - row_size
-        endx = startx + (2 * row_size) - 1
-        top_half_check = (y < self.HALF_ARENA and x >= startx and x <= endx)
-
-        row_size = (self.ARENA_SIZE - 1 - y) + 1
-        startx = half_board - row_size
-        endx = startx + (2 * row_size) - 1
-        bottom_half_check = (y >= self.HALF_ARENA and x >= startx and x <= endx)
-
-        return bottom_half_check or top_half_check
+        if type(x) == int and type(y) == int:
+            return 0 <= x < ARENA_SIZE and 0 <= y < ARENA_SIZE and IN_BOUNDS[x * ARENA_SIZE + y] == 1
+        return in_arena_bounds(x, y)
 
     def get_edge_locations(self, quadrant_description):
         """Takes in an edge description and returns a list of locations.
@@ -117,8 +422,7 @@ class GameMap:
             self.warn("Passed invalid quadrant_description '{}'. See the documentation for valid inputs for get_edge_locations.".format(quadrant_description))
             return
 
-        edges = self.get_edges()
-        return edges[quadrant_description]
+        return [list(location) for location in EDGE_LOCATIONS[quadrant_description]]
 
     def get_edges(self):
         """Gets all of the edges and their edge locations
@@ -127,27 +431,7 @@ class GameMap:
             A list with four lists inside of it of locations corresponding to the four edges.
             [0] = top_right, [1] = top_left, [2] = bottom_left, [3] = bottom_right.
         """
-        top_right = []
-        for num in range(0, self.HALF_ARENA):
-            x = self.HALF_ARENA + num
-            y = self.ARENA_SIZE - 1 - num
-            top_right.append([int(x), int(y)])
-        top_left = []
-        for num in range(0, self.HALF_ARENA):
-            x = self.HALF_ARENA - 1 - num
-            y = self.ARENA_SIZE - 1 - num
-            top_left.append([int(x), int(y)])
-        bottom_left = []
-        for num in range(0, self.HALF_ARENA):
-            x = self.HALF_ARENA - 1 - num
-            y = num
-            bottom_left.append([int(x), int(y)])
-        bottom_right = []
-        for num in range(0, self.HALF_ARENA):
-            x = self.HALF_ARENA + num
-            y = num
-            bottom_right.append([int(x), int(y)])
-        return [top_right, top_left, bottom_left, bottom_right]
+        return [[list(location) for location in edge] for edge in EDGE_LOCATIONS]
     
     def add_unit(self, unit_type, location, player_index=0):
         """Add a single GameUnit to the map at the given location.
@@ -167,11 +451,15 @@ class GameMap:
             self.warn("Player index {} is invalid. Player index should be 0 or 1.".format(player_index))
 
         x, y = location
-        new_unit = GameUnit(unit_type, self.config, player_index, None, location[0], location[1])
+        new_unit = GameUnit(unit_type, self.game_config, player_index, None, location[0], location[1])
         if not new_unit.stationary:
-            self.__map[x][y].append(new_unit)
+            self.__own_tile(x, y).append(new_unit)
         else:
+            self.__own_column(x)
+            self.__pending.pop(x * self.ARENA_SIZE + y, None)
             self.__map[x][y] = [new_unit]
+            self.__owned_tiles[x * self.ARENA_SIZE + y] = 1
+        self.__tile_changed(x, y)
 
     def remove_unit(self, location):
         """Remove all units on the map in the given location.
@@ -186,7 +474,11 @@ class GameMap:
             self._invalid_coordinates(location)
         
         x, y = location
+        self.__own_column(x)
+        self.__pending.pop(x * self.ARENA_SIZE + y, None)
         self.__map[x][y] = []
+        self.__owned_tiles[x * self.ARENA_SIZE + y] = 1
+        self.__tile_changed(x, y)
 
     def get_locations_in_range(self, location, radius):
         """Gets locations in a circular area around a location
@@ -203,11 +495,13 @@ class GameMap:
             self.warn("Radius {} was passed to get_locations_in_range. Expected integer between 0 and {}".format(radius, self.ARENA_SIZE))
         if not self.in_arena_bounds(location):
             self._invalid_coordinates(location)
+        elif type(location[0]) == int and type(location[1]) == int:
+            return [[TILE_X[index], TILE_Y[index]] for index in tiles_in_range(location[0] * ARENA_SIZE + location[1], radius + self.__hit_radius)]
 
         x, y = location
         locations = []
         search_radius = math.ceil(radius)
-        getHitRadius = self.config["unitInformation"][0]['getHitRadius']
+        getHitRadius = self.__hit_radius
         for i in range(int(x - search_radius), int(x + search_radius + 1)):
             for j in range(int(y - search_radius), int(y + search_radius + 1)):
                 new_location = [i, j]
@@ -1,21 +1,15 @@
+import copy
 import math
 import json
 import sys
 
-from .navigation import ShortestPathFinder
+from .navigation import ShortestPathFinder, PathingContext
+from .geometry import BOTTOM_EDGE_LOCATIONS, EDGE_TILE_SETS, location_to_index
 from .util import send_command, debug_write
 from .unit import GameUnit
 from .game_map import GameMap
-
-def is_stationary(unit_type):
-    """
-        Args:
-            unit_type: A unit type
-        
-        Returns: 
-            Boolean, True if the unit is stationary, False otherwise.
-    """
-    return unit_type in STRUCTURE_TYPES
+from .threat_map import ThreatMap
+from .game_config import GameConfig
 
 class GameState:
     """Represents the entire gamestate for a given turn
@@ -31,13 +25,15 @@ class GameState:
         * INTERCEPTOR (str): A constant representing the interceptor unit
         * REMOVE (str): A constant representing removing your own unit
         * UPGRADE (str): A constant representing upgrading a unit
-        * STRUCTURE_TYPES (list): A list of the structure units
+        * STRUCTURE_TYPES (tuple): The structure units
+        * ALL_UNITS (tuple): The mobile units, then the structure units
 
         * ARENA_SIZE (int): The size of the arena
         * HALF_ARENA (int): Half the size of the arena
         * MP (int): A constant representing the Mobile Points resource, used in the get_resource function
         * SP (int): A constant representing the SP resource, used in the get_resource function
          
+        * game_config (GameConfig): The constants of this game's config, shared with the game_map and its units
         * game_map (:obj: GameMap): The current GameMap. To retrieve a list of GameUnits at a location, use game_map[x, y]
         * turn_number (int): The current turn number. Starts at 0.
         * my_health (int): Your current remaining health
@@ -47,63 +43,56 @@ class GameState:
 
     """
 
-    def __init__(self, config, serialized_string):
+    def __init__(self, config, serialized_string, state=None):
         """ Setup a turns variables using arguments passed
 
         Args:
-            * config (JSON): A json object containing information about the game
+            * config (JSON): A json object containing information about the game, or its GameConfig
             * serialized_string (string): A string containing information about the game state at the start of this turn
+            * state (dict): serialized_string already decoded with json.loads, to save decoding it again. It is not modified.
 
         """
         self.serialized_string = serialized_string
-        self.config = config
+        self._state = state if state is not None else json.loads(serialized_string)
+        self.game_config = GameConfig.get(config)
+        self.config = self.game_config.config
         self.enable_warnings = True
 
-        global WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, REMOVE, UPGRADE, STRUCTURE_TYPES, ALL_UNITS, UNIT_TYPE_TO_INDEX
-        UNIT_TYPE_TO_INDEX = {}
-        WALL = config["unitInformation"][0]["shorthand"]
-        UNIT_TYPE_TO_INDEX[WALL] = 0
-        SUPPORT = config["unitInformation"][1]["shorthand"]
-        UNIT_TYPE_TO_INDEX[SUPPORT] = 1
-        TURRET = config["unitInformation"][2]["shorthand"]
-        UNIT_TYPE_TO_INDEX[TURRET] = 2
-        SCOUT = config["unitInformation"][3]["shorthand"]
-        UNIT_TYPE_TO_INDEX[SCOUT] = 3
-        DEMOLISHER = config["unitInformation"][4]["shorthand"]
-        UNIT_TYPE_TO_INDEX[DEMOLISHER] = 4
-        INTERCEPTOR = config["unitInformation"][5]["shorthand"]
-        UNIT_TYPE_TO_INDEX[INTERCEPTOR] = 5
-        REMOVE = config["unitInformation"][6]["shorthand"]
-        UNIT_TYPE_TO_INDEX[REMOVE] = 6
-        UPGRADE = config["unitInformation"][7]["shorthand"]
-        UNIT_TYPE_TO_INDEX[UPGRADE] = 7
-
-        ALL_UNITS = [SCOUT, DEMOLISHER, INTERCEPTOR, WALL, SUPPORT, TURRET]
-        STRUCTURE_TYPES = [WALL, SUPPORT, TURRET]
+        game_config = self.game_config
+        self.UNIT_TYPE_TO_INDEX = game_config.UNIT_TYPE_TO_INDEX
+        self.WALL = game_config.WALL
+        self.SUPPORT = game_config.SUPPORT
+        self.TURRET = game_config.TURRET
+        self.SCOUT = game_config.SCOUT
+        self.DEMOLISHER = game_config.DEMOLISHER
+        self.INTERCEPTOR = game_config.INTERCEPTOR
+        self.REMOVE = game_config.REMOVE
+        self.UPGRADE = game_config.UPGRADE
+        self.STRUCTURE_TYPES = game_config.STRUCTURE_TYPES
+        self.ALL_UNITS = game_config.ALL_UNITS
 
         self.ARENA_SIZE = 28
         self.HALF_ARENA = int(self.ARENA_SIZE / 2)
-        self.MP = 1
-        self.SP = 0
-        global MP, SP
-        MP = self.MP
-        SP = self.SP
+        self.MP = game_config.MP
+        self.SP = game_config.SP
 
-        self.game_map = GameMap(self.config)
+        self.game_map = GameMap(game_config)
         self._shortest_path_finder = ShortestPathFinder()
+        self._pathing_context = None
+        self._threat_map = None
         self._build_stack = []
         self._deploy_stack = []
+        self._checkpoints = []
         self._player_resources = [
                 {'SP': 0, 'MP': 0},  # player 0, which is you
                 {'SP': 0, 'MP': 0}]  # player 1, which is the opponent
-        self.__parse_state(serialized_string)
+        self.__parse_state(self._state)
 
-    def __parse_state(self, state_line):
+    def __parse_state(self, state):
         """
         Fills in map based on the serialized game state so that self.game_map[x,y] is a list of GameUnits at that location.
-        state_line is the game state as a json string.
+        state is the game state decoded from json. GameUnits are only made when their tile is first read, see GameMap._defer_units.
         """
-        state = json.loads(state_line)
 
         turn_info = state["turnInfo"]
         self.turn_number = int(turn_info[1])
@@ -123,34 +112,38 @@ class GameState:
         p1units = state["p1Units"]
         p2units = state["p2Units"]
 
-        self.__create_parsed_units(p1units, 0)
-        self.__create_parsed_units(p2units, 1)
+        tiles = {}
+        self.__create_parsed_units(p1units, 0, tiles)
+        self.__create_parsed_units(p2units, 1, tiles)
+        self.game_map._defer_units(tiles)
 
-    def __create_parsed_units(self, units, player_number):
+    def __create_parsed_units(self, units, player_number, tiles):
         """
-        Helper function for __parse_state to add units to the map.
+        Helper function for __parse_state to collect the units of each tile.
         """
         typedef = self.config.get("unitInformation")
+        arena_size = self.ARENA_SIZE
         for i, unit_types in enumerate(units):
+            unit_type = typedef[i].get("shorthand")
+            # This depends on RM and UP always being the last types to be processed
+            if unit_type == self.REMOVE or unit_type == self.UPGRADE:
+                flag = 4 if unit_type == self.REMOVE else 3
+                for uinfo in unit_types:
+                    entries = tiles.get(int(uinfo[0]) * arena_size + int(uinfo[1]))
+                    if entries and entries[0][0] in self.STRUCTURE_TYPES:
+                        # Quick fix will deploy engine fix soon
+                        entries[0][flag] = True
+                continue
             for uinfo in unit_types:
-                unit_type = typedef[i].get("shorthand")
-                sx, sy, shp = uinfo[:3]
-                x, y = map(int, [sx, sy])
-                hp = float(shp)
-                # This depends on RM and UP always being the last types to be processed
-                if unit_type == REMOVE:
-                    # Quick fix will deploy engine fix soon
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].pending_removal = True
-                elif unit_type == UPGRADE:
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].upgrade()
+                index = int(uinfo[0]) * arena_size + int(uinfo[1])
+                entry = [unit_type, player_number, float(uinfo[2]), False, False]
+                if index in tiles:
+                    tiles[index].append(entry)
                 else:
-                    unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
-                    self.game_map[x,y].append(unit)
+                    tiles[index] = [entry]
 
     def __resource_required(self, unit_type):
-        return self.SP if is_stationary(unit_type) else self.MP
+        return self.SP if self.game_config.is_stationary(unit_type) else self.MP
 
     def __set_resource(self, resource_type, amount, player_index=0):
         """
@@ -234,18 +227,18 @@ class GameState:
             The number of units affordable of the given unit_type.
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
 
         costs = self.type_cost(unit_type)
         player_held = self.get_resources()
-        if costs[MP] > 0 and costs[SP] > 0:
-            return min(math.floor(player_held[SP] / costs[SP]), math.floor(player_held[MP] / costs[MP]))
-        elif costs[MP] > 0:
-            return math.floor(player_held[MP] / costs[MP])
-        elif costs[SP] > 0:
-            return math.floor(player_held[SP] / costs[SP])
+        if costs[self.MP] > 0 and costs[self.SP] > 0:
+            return min(math.floor(player_held[self.SP] / costs[self.SP]), math.floor(player_held[self.MP] / costs[self.MP]))
+        elif costs[self.MP] > 0:
+            return math.floor(player_held[self.MP] / costs[self.MP])
+        elif costs[self.SP] > 0:
+            return math.floor(player_held[self.SP] / costs[self.SP])
         else:
             self.warn("Invalid costs for unit, cost is 0 for both resources, returning 0")
             return 0
@@ -292,14 +285,14 @@ class GameState:
             The units costs as a list [SP, MP]
 
         """
-        if unit_type == REMOVE:
+        if unit_type == self.REMOVE:
             self._invalid_unit(unit_type)
             return
         
-        unit_def = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[unit_type]]
+        unit_def = self.config["unitInformation"][self.UNIT_TYPE_TO_INDEX[unit_type]]
         cost_base = [unit_def.get('cost1', 0), unit_def.get('cost2', 0)]
         if upgrade:
-            return [unit_def.get('upgrade', {}).get('cost1', cost_base[SP]), unit_def.get('upgrade', {}).get('cost2', cost_base[MP])]
+            return [unit_def.get('upgrade', {}).get('cost1', cost_base[self.SP]), unit_def.get('upgrade', {}).get('cost2', cost_base[self.MP])]
 
         return cost_base
 
@@ -320,7 +313,7 @@ class GameState:
             True if we can spawn the unit(s)
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
         
@@ -330,10 +323,10 @@ class GameState:
             return False
 
         affordable = self.number_affordable(unit_type) >= num
-        stationary = is_stationary(unit_type)
+        stationary = self.game_config.is_stationary(unit_type)
         blocked = self.contains_stationary_unit(location) or (stationary and len(self.game_map[location[0],location[1]]) > 0)
         correct_territory = location[1] < self.HALF_ARENA
-        on_edge = location in (self.game_map.get_edge_locations(self.game_map.BOTTOM_LEFT) + self.game_map.get_edge_locations(self.game_map.BOTTOM_RIGHT))
+        on_edge = (location[0], location[1]) in BOTTOM_EDGE_LOCATIONS
 
         if self.enable_warnings:
             fail_reason = ""
@@ -364,7 +357,7 @@ class GameState:
             The number of units successfully spawned
 
         """
-        if unit_type not in ALL_UNITS:
+        if unit_type not in self.ALL_UNITS:
             self._invalid_unit(unit_type)
             return
         if num < 1:
@@ -379,10 +372,10 @@ class GameState:
                 if self.can_spawn(unit_type, location, 1):
                     x, y = map(int, location)
                     costs = self.type_cost(unit_type)
-                    self.__set_resource(SP, 0 - costs[SP])
-                    self.__set_resource(MP, 0 - costs[MP])
+                    self.__set_resource(self.SP, 0 - costs[self.SP])
+                    self.__set_resource(self.MP, 0 - costs[self.MP])
                     self.game_map.add_unit(unit_type, location, 0)
-                    if is_stationary(unit_type):
+                    if self.game_config.is_stationary(unit_type):
                         self._build_stack.append((unit_type, x, y))
                     else:
                         self._deploy_stack.append((unit_type, x, y))
@@ -407,7 +400,7 @@ class GameState:
         for location in locations:
             if location[1] < self.HALF_ARENA and self.contains_stationary_unit(location):
                 x, y = map(int, location)
-                self._build_stack.append((REMOVE, x, y))
+                self._build_stack.append((self.REMOVE, x, y))
                 removed_units += 1
             else:
                 self.warn("Could not remove a unit from {}. Location has no structures or is enemy territory.".format(location))
@@ -435,19 +428,106 @@ class GameState:
                     if unit.stationary:
                         existing_unit = unit
 
-                if not existing_unit.upgraded and self.config["unitInformation"][UNIT_TYPE_TO_INDEX[existing_unit.unit_type]].get("upgrade", None) is not None:
+                if not existing_unit.upgraded and self.config["unitInformation"][self.UNIT_TYPE_TO_INDEX[existing_unit.unit_type]].get("upgrade", None) is not None:
                     costs = self.type_cost(existing_unit.unit_type, True)
                     resources = self.get_resources()
-                    if resources[SP] >= costs[SP] and resources[MP] >= costs[MP]:
-                        self.__set_resource(SP, 0 - costs[SP])
-                        self.__set_resource(MP, 0 - costs[MP])
-                        existing_unit.upgrade()
-                        self._build_stack.append((UPGRADE, x, y))
+                    if resources[self.SP] >= costs[self.SP] and resources[self.MP] >= costs[self.MP]:
+                        self.__set_resource(self.SP, 0 - costs[self.SP])
+                        self.__set_resource(self.MP, 0 - costs[self.MP])
+                        for unit in self.game_map.get_units_for_update([x, y]):
+                            if unit.stationary:
+                                unit.upgrade()
+                        self.game_map.update_tile([x, y])
+                        self._build_stack.append((self.UPGRADE, x, y))
                         spawned_units += 1
             else:
                 self.warn("Could not upgrade a unit from {}. Location has no structures or is enemy territory.".format(location))
         return spawned_units
 
+    def apply_build_plan(self, entries):
+        """Spawns, and upgrades if asked, the unit of every entry in order, with the same results as calling
+        attempt_spawn and then attempt_upgrade for each entry.
+
+        Each entry is checked and committed in a single pass against running resource totals, looking up
+        each unit type's costs once, and warnings are only put together for entries that fail.
+
+        Args:
+            entries: A list of [unit_type, [x, y], upgrade] entries, like mkT, mkW and mkS make in algo_strategy
+
+        Returns:
+            A list with a [spawned, upgraded] pair of booleans for each entry
+
+        """
+        resources = self._player_resources[0]
+        SP, MP = self.SP, self.MP
+        costs = {}
+        #The upgrade cost of each type, None if it can not be upgraded
+        upgrade_costs = {}
+        results = []
+        for unit_type, location, upgrade in entries:
+            spawned = upgraded = False
+            if unit_type not in self.ALL_UNITS:
+                self._invalid_unit(unit_type)
+            elif not self.game_map.in_arena_bounds(location):
+                if self.enable_warnings:
+                    self.warn("Could not spawn {} at location {}. Location invalid.".format(unit_type, location))
+            else:
+                x, y = map(int, location)
+                units = self.game_map[x, y]
+                stationary = self.game_config.is_stationary(unit_type)
+                cost = costs.get(unit_type)
+                if cost is None:
+                    cost = costs[unit_type] = self.type_cost(unit_type)
+                if (location[1] < self.HALF_ARENA and
+                        not (units and (stationary or any(unit.stationary for unit in units))) and
+                        (stationary or (location[0], location[1]) in BOTTOM_EDGE_LOCATIONS) and
+                        self.__affordable(cost, resources['SP'], resources['MP'])):
+                    resources['SP'] -= cost[SP]
+                    resources['MP'] -= cost[MP]
+                    self.game_map.add_unit(unit_type, location, 0)
+                    if stationary:
+                        self._build_stack.append((unit_type, x, y))
+                    else:
+                        self._deploy_stack.append((unit_type, x, y))
+                    spawned = True
+                elif self.enable_warnings:
+                    #Only failures pay for the reasons
+                    self.can_spawn(unit_type, location)
+
+            if upgrade:
+                existing_unit = location[1] < self.HALF_ARENA and self.contains_stationary_unit(location)
+                if existing_unit:
+                    existing_type = existing_unit.unit_type
+                    if existing_type not in upgrade_costs:
+                        upgradable = self.config["unitInformation"][self.UNIT_TYPE_TO_INDEX[existing_type]].get("upgrade", None) is not None
+                        upgrade_costs[existing_type] = self.type_cost(existing_type, True) if upgradable else None
+                    cost = upgrade_costs[existing_type]
+                    if not existing_unit.upgraded and cost is not None and resources['SP'] >= cost[SP] and resources['MP'] >= cost[MP]:
+                        resources['SP'] -= cost[SP]
+                        resources['MP'] -= cost[MP]
+                        x, y = map(int, location)
+                        for unit in self.game_map.get_units_for_update([x, y]):
+                            if unit.stationary:
+                                unit.upgrade()
+                        self.game_map.update_tile([x, y])
+                        self._build_stack.append((self.UPGRADE, x, y))
+                        upgraded = True
+                else:
+                    self.warn("Could not upgrade a unit from {}. Location has no structures or is enemy territory.".format(location))
+            results.append([spawned, upgraded])
+        return results
+
+    def __affordable(self, cost, held_SP, held_MP):
+        #The same test as number_affordable(unit_type) >= 1
+        if cost[self.MP] > 0 and cost[self.SP] > 0:
+            return min(math.floor(held_SP / cost[self.SP]), math.floor(held_MP / cost[self.MP])) >= 1
+        elif cost[self.MP] > 0:
+            return math.floor(held_MP / cost[self.MP]) >= 1
+        elif cost[self.SP] > 0:
+            return math.floor(held_SP / cost[self.SP]) >= 1
+        self.warn("Invalid costs for unit, cost is 0 for both resources, returning 0")
+        return False
+
     def get_target_edge(self, start_location):
         """Gets the target edge given a starting location
 
@@ -492,7 +572,163 @@ class GameState:
             target_edge = self.get_target_edge(start_location)
 
         end_points = self.game_map.get_edge_locations(target_edge)
-        return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self)
+        return self._shortest_path_finder.navigate_multiple_endpoints(start_location, end_points, self, self.get_pathing_context())
+
+    def find_paths_to_edges(self, start_locations, target_edge=None):
+        """Gets the paths units at many locations would take, in one call.
+        Starts heading for the same edge share their pathfinding work, so this is much
+        cheaper than calling find_path_to_edge once per location.
+
+        Args:
+            start_locations: A list of locations of hypothetical units
+            target_edge: The edge every unit wants to reach. Induced from each start location if None.
+
+        Returns:
+            A list with the path for each start location, in the same order as start_locations.
+            Entries are None for start locations that are blocked.
+
+        """
+        paths = [None] * len(start_locations)
+        starts_by_edge = {}
+        for i, start_location in enumerate(start_locations):
+            if self.contains_stationary_unit(start_location):
+                self.warn("Attempted to perform pathing from blocked starting location {}".format(start_location))
+                continue
+            edge = self.get_target_edge(start_location) if target_edge is None else target_edge
+            starts_by_edge.setdefault(edge, []).append(i)
+
+        for edge, indices in starts_by_edge.items():
+            end_points = self.game_map.get_edge_locations(edge)
+            edge_paths = self._shortest_path_finder.navigate_multiple_starts(
+                [start_locations[i] for i in indices], end_points, self, self.get_pathing_context())
+            for i, path in zip(indices, edge_paths):
+                paths[i] = path
+        return paths
+
+    def would_block_path(self, location, start_points, target_edge=None):
+        """Checks if placing a structure at a location would seal every given start off from its edge.
+        Answered from cached connectivity data, so checking hundreds of candidate tiles is cheap.
+
+        Args:
+            location: The location of a hypothetical new structure
+            start_points: The locations of hypothetical units
+            target_edge: The edge every unit wants to reach. Induced from each start location if None.
+
+        Returns:
+            True if, with a structure at location, none of the start points can reach its target edge
+
+        """
+        if not self.game_map.in_arena_bounds(location):
+            self.warn("Location {} is not in the arena bounds.".format(location))
+            return False
+
+        connectivity = self.get_pathing_context().get_connectivity()
+        blocked_index = location_to_index(location)
+        for start_location in start_points:
+            if not self.game_map.in_arena_bounds(start_location):
+                self.warn("Start location {} is not in the arena bounds.".format(start_location))
+                continue
+            edge = self.get_target_edge(start_location) if target_edge is None else target_edge
+            if connectivity.can_reach_edge(location_to_index(start_location), edge, blocked_index):
+                return False
+        return True
+
+    def get_pathing_context(self):
+        """Gets the obstacle grid shared by all pathing queries on this game state.
+
+        It is built on first use and kept in sync by attempt_spawn and GameMap.add_unit/remove_unit,
+        so any number of find_path_to_edge calls cost a single grid build.
+        Structures flagged by attempt_remove stay on the board until the turn ends, so they remain blocked.
+
+        Returns:
+            The PathingContext for the current game map
+
+        """
+        if self._pathing_context is None:
+            self._pathing_context = PathingContext(self.game_map)
+            self.game_map.add_listener(self._pathing_context)
+        return self._pathing_context
+
+    def invalidate_pathing_context(self):
+        """Discards the shared obstacle grid so the next pathing query rebuilds it.
+        Only needed after editing the lists returned by game_map[x, y] directly.
+        """
+        if self._pathing_context is not None:
+            self.game_map.remove_listener(self._pathing_context)
+            self._pathing_context = None
+        if self._threat_map is not None:
+            self.game_map.remove_listener(self._threat_map)
+            self._threat_map = None
+
+    def fork(self):
+        """Makes a cheap hypothetical copy of this GameState to try moves on.
+
+        The map is forked copy on write, see GameMap.fork, and the build and deploy stacks and
+        resources are copied, so attempt_spawn, attempt_remove and attempt_upgrade on either state
+        leave the other untouched. The pathing context and threat map are rebuilt on the fork when first used.
+
+        Returns:
+            The new GameState
+
+        """
+        child = copy.copy(self)
+        child.game_map = self.game_map.fork()
+        child._shortest_path_finder = ShortestPathFinder()
+        child._pathing_context = None
+        child._threat_map = None
+        child._build_stack = list(self._build_stack)
+        child._deploy_stack = list(self._deploy_stack)
+        child._player_resources = [dict(resources) for resources in self._player_resources]
+        child._checkpoints = []
+        return child
+
+    def checkpoint(self):
+        """Marks the current turn so rollback can return to it, as a cheaper alternative to fork for depth first search.
+        The map, build and deploy stacks and resources are all restored by rollback, in time proportional to the changes.
+
+        Returns:
+            A checkpoint to pass to rollback or release
+
+        """
+        resources = [dict(player_resources) for player_resources in self._player_resources]
+        self._checkpoints.append((self.game_map.checkpoint(), len(self._build_stack), len(self._deploy_stack), resources))
+        return len(self._checkpoints) - 1
+
+    def rollback(self, checkpoint):
+        """Undoes every attempt_spawn, attempt_remove and attempt_upgrade, and every GameMap change, since a checkpoint.
+        The checkpoint stays open, so several alternatives can be tried from it in turn. Later checkpoints are released.
+
+        Args:
+            checkpoint: A checkpoint returned by checkpoint()
+
+        """
+        map_checkpoint, build_length, deploy_length, resources = self._checkpoints[checkpoint]
+        del self._checkpoints[checkpoint + 1:]
+        self.game_map.rollback(map_checkpoint)
+        del self._build_stack[build_length:]
+        del self._deploy_stack[deploy_length:]
+        self._player_resources = [dict(player_resources) for player_resources in resources]
+
+    def release(self, checkpoint):
+        """Keeps everything done since a checkpoint and closes it, along with any later checkpoints
+
+        Args:
+            checkpoint: A checkpoint returned by checkpoint()
+
+        """
+        map_checkpoint = self._checkpoints[checkpoint][0]
+        del self._checkpoints[checkpoint:]
+        self.game_map.release(map_checkpoint)
+
+    def snapshot(self):
+        """Packs the board and both players' stats into a compact BoardSnapshot, see snapshot.py
+
+        Returns:
+            A BoardSnapshot, which can rebuild a GameState with to_game_state
+
+        """
+        from .snapshot import BoardSnapshot
+        return BoardSnapshot.from_game_state(self)
 
     def contains_stationary_unit(self, location):
         """Check if a location is blocked, return structures unit if it is
@@ -561,7 +797,7 @@ class GameState:
 
         for location in possible_locations:
             for unit in self.game_map[location]:
-                if unit.player_index == attacking_unit.player_index or (attacking_unit.damage_f == 0 and is_stationary(unit.unit_type)) or (attacking_unit.damage_i == 0 and not(is_stationary(unit.unit_type))):
+                if unit.player_index == attacking_unit.player_index or (attacking_unit.damage_f == 0 and self.game_config.is_stationary(unit.unit_type)) or (attacking_unit.damage_i == 0 and not(self.game_config.is_stationary(unit.unit_type))):
                     continue
 
                 new_target = False
@@ -610,6 +846,62 @@ class GameState:
                     target_x_distance = unit_x_distance
         return target
 
+    def get_threat_map(self):
+        """Gets the per tile damage map of every structure on the board.
+        It is built on first use and kept in sync by attempt_spawn, attempt_upgrade and
+        GameMap.add_unit/remove_unit, so scoring a path is a sum over its tiles instead of
+        one get_attackers call per step.
+
+        Returns:
+            The ThreatMap for the current game map
+
+        """
+        if self._threat_map is None:
+            self._threat_map = ThreatMap(self.game_map)
+            self.game_map.add_listener(self._threat_map)
+        return self._threat_map
+
+    def estimate_path_damage(self, start_location, unit_type, count=1):
+        """Estimates what happens to a group of mobile units spawned at a location, using the cached threat map.
+
+        The group walks the path from find_path_to_edge, spending 1 / speed frames on every tile.
+        Each frame it takes the summed damage of enemy structures in range, and each friendly support
+        in range of the path shields every unit once. A group that breaches takes no damage on its final edge tile.
+        Damage is assumed to be focused on one unit at a time.
+
+        Args:
+            start_location: The location the units are spawned at
+            unit_type: The type of mobile unit, SCOUT, DEMOLISHER or INTERCEPTOR
+            count: The number of units in the group
+
+        Returns:
+            A dict with the 'path' walked, the total 'damage' taken by the group, the 'shield' each unit picks up,
+            the estimated number of 'survivors' and whether the path 'reaches_edge'. None if there is no path.
+
+        """
+        if unit_type not in self.ALL_UNITS or self.game_config.is_stationary(unit_type):
+            self._invalid_unit(unit_type)
+            return
+
+        path = self.find_path_to_edge(start_location)
+        if path is None:
+            return
+
+        unit = GameUnit(unit_type, self.game_config)
+        player_index = 0 if start_location[1] < self.HALF_ARENA else 1
+        threat_map = self.get_threat_map()
+        reaches_edge = location_to_index(path[-1]) in EDGE_TILE_SETS[self.get_target_edge(start_location)]
+
+        frames_per_tile = 1 / unit.speed
+        damaged_tiles = path[:-1] if reaches_edge else path
+        damage = threat_map.path_damage(damaged_tiles, player_index) * frames_per_tile
+        shield = threat_map.path_shielding(path, player_index)
+
+        unit_health = unit.max_health + shield
+        remaining_health = count * unit_health - damage
+        survivors = max(0, math.ceil(remaining_health / unit_health)) if unit_health > 0 else 0
+        return {"path": path, "damage": damage, "shield": shield, "survivors": survivors, "reaches_edge": reaches_edge}
+
     def get_attackers(self, location, player_index):
         """Gets the stationary units threatening a given location
 
@@ -0,0 +1,128 @@
+"""
+The shape of the arena, computed once at import and shared by every module.
+
+Tiles are stored in flat arrays indexed by x * ARENA_SIZE + y, so the
+hot loops of spawning, pathing and range queries never have to do bounds
+checks, build edge lists or take square roots.
+"""
+import math
+from array import array
+
+ARENA_SIZE = 28
+HALF_ARENA = ARENA_SIZE // 2
+NUM_TILES = ARENA_SIZE * ARENA_SIZE
+
+
+def in_arena_bounds(x, y):
+    """Checks if [x, y] is inside the diamond shaped game board. Works for any numbers, see IN_BOUNDS for integer tiles
+
+    Args:
+        x: The x coordinate
+        y: The y coordinate
+
+    Returns:
+        True if the location is on the board, False otherwise
+
+    """
+    if y < HALF_ARENA:
+        return HALF_ARENA - 1 - y <= x <= HALF_ARENA + y
+    return y - HALF_ARENA <= x <= ARENA_SIZE - 1 - (y - HALF_ARENA)
+
+
+TILE_X = tuple(index // ARENA_SIZE for index in range(NUM_TILES))
+TILE_Y = tuple(index % ARENA_SIZE for index in range(NUM_TILES))
+IN_BOUNDS = bytes(1 if 0 <= TILE_Y[i] < ARENA_SIZE and in_arena_bounds(TILE_X[i], TILE_Y[i]) else 0 for i in range(NUM_TILES))
+IN_BOUNDS_INDICES = tuple(index for index in range(NUM_TILES) if IN_BOUNDS[index])
+
+
+def location_to_index(location):
+    """Converts an [x, y] location into its flat tile index
+    """
+    return int(location[0]) * ARENA_SIZE + int(location[1])
+
+
+def index_to_location(index):
+    """Converts a flat tile index into its [x, y] location
+    """
+    return [TILE_X[index], TILE_Y[index]]
+
+
+def _build_neighbors(index):
+    # Same order as the reference implementation: up, down, right, left
+    x, y = TILE_X[index], TILE_Y[index]
+    neighbors = []
+    for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+        if 0 <= nx < ARENA_SIZE and 0 <= ny < ARENA_SIZE and IN_BOUNDS[nx * ARENA_SIZE + ny]:
+            neighbors.append(nx * ARENA_SIZE + ny)
+    return tuple(neighbors)
+
+NEIGHBORS = tuple(_build_neighbors(index) for index in range(NUM_TILES))
+
+#Edge tile indices in the same order as GameMap.get_edges: top right, top left, bottom left, bottom right
+EDGE_INDICES = (
+    tuple((HALF_ARENA + num) * ARENA_SIZE + ARENA_SIZE - 1 - num for num in range(HALF_ARENA)),
+    tuple((HALF_ARENA - 1 - num) * ARENA_SIZE + ARENA_SIZE - 1 - num for num in range(HALF_ARENA)),
+    tuple((HALF_ARENA - 1 - num) * ARENA_SIZE + num for num in range(HALF_ARENA)),
+    tuple((HALF_ARENA + num) * ARENA_SIZE + num for num in range(HALF_ARENA)))
+#The same edges as (x, y) tuples
+EDGE_LOCATIONS = tuple(tuple((TILE_X[index], TILE_Y[index]) for index in edge) for edge in EDGE_INDICES)
+#The same edges as sets, for membership tests
+EDGE_TILE_SETS = tuple(frozenset(edge) for edge in EDGE_INDICES)
+#The edges player 0 and player 1 deploy from
+BOTTOM_EDGE_TILES = EDGE_TILE_SETS[2] | EDGE_TILE_SETS[3]
+TOP_EDGE_TILES = EDGE_TILE_SETS[0] | EDGE_TILE_SETS[1]
+EDGE_TILES = BOTTOM_EDGE_TILES | TOP_EDGE_TILES
+#Player 0's deploy edge as (x, y) tuples, which also match float locations
+BOTTOM_EDGE_LOCATIONS = frozenset(EDGE_LOCATIONS[2] + EDGE_LOCATIONS[3])
+
+# Distance between two tiles, indexed abs(dx) * ARENA_SIZE + abs(dy)
+DISTANCE = array('d', [math.sqrt(dx**2 + dy**2) for dx in range(ARENA_SIZE) for dy in range(ARENA_SIZE)])
+
+# Sorted in bounds tile indices strictly closer than a reach to each tile, keyed by reach
+_RANGE_TILES = {}
+# The same with tiles at exactly the reach included
+_INCLUSIVE_RANGE_TILES = {}
+# The same tiles as frozensets
+_RANGE_TILE_SETS = {}
+
+
+def tiles_in_range(index, reach, inclusive=False):
+    """The in bounds tile indices whose centers are closer than reach to the tile at index, in index order.
+    A unit with a range affects the tiles within range + getHitRadius. Each table is filled as tiles are asked for.
+
+    Args:
+        index: The flat index of the center tile
+        reach: The distance the tiles must be below
+        inclusive: Also include tiles at exactly reach, the test GameState.get_attackers uses
+
+    Returns:
+        A sorted tuple of tile indices
+
+    """
+    tables = _INCLUSIVE_RANGE_TILES if inclusive else _RANGE_TILES
+    table = tables.get(reach)
+    if table is None:
+        table = tables[reach] = [None] * NUM_TILES
+    tiles = table[index]
+    if tiles is None:
+        x, y = TILE_X[index], TILE_Y[index]
+        search_radius = math.ceil(reach)
+        tiles = tuple(i * ARENA_SIZE + j
+                      for i in range(max(0, x - search_radius), min(ARENA_SIZE, x + search_radius + 1))
+                      for j in range(max(0, y - search_radius), min(ARENA_SIZE, y + search_radius + 1))
+                      if IN_BOUNDS[i * ARENA_SIZE + j] and (DISTANCE[abs(x - i) * ARENA_SIZE + abs(y - j)] < reach or
+                                                            inclusive and DISTANCE[abs(x - i) * ARENA_SIZE + abs(y - j)] == reach))
+        table[index] = tiles
+    return tiles
+
+
+def tile_set_in_range(index, reach):
+    """tiles_in_range as a frozenset
+    """
+    table = _RANGE_TILE_SETS.get(reach)
+    if table is None:
+        table = _RANGE_TILE_SETS[reach] = [None] * NUM_TILES
+    tiles = table[index]
+    if tiles is None:
+        tiles = table[index] = frozenset(tiles_in_range(index, reach))
+    return tiles
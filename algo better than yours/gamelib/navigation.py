@@ -1,24 +1,347 @@
-import heapq
-import math
 import sys
-import queue
+import time
+import hashlib
+from array import array
+from collections import deque, OrderedDict
 from .util import debug_write
+from .geometry import ARENA_SIZE, HALF_ARENA, NUM_TILES, TILE_X, TILE_Y, IN_BOUNDS_INDICES, NEIGHBORS, \
+    EDGE_INDICES, location_to_index
 
-class Node:
-    """A pathfinding node
+
+def _build_idealness(direction):
+    dx, dy = direction
+    table = array('l', [0]) * NUM_TILES
+    for index in range(NUM_TILES):
+        x, y = TILE_X[index], TILE_Y[index]
+        table[index] = 28 * (y if dy == 1 else 27 - y) + (x if dx == 1 else 27 - x)
+    return table
+
+IDEALNESS = {(dx, dy): _build_idealness((dx, dy)) for dx in (1, -1) for dy in (1, -1)}
+
+
+def _repair_opened(field, blocked, index, is_seed):
+    """Updates a distance field in place after the tile at index stopped being blocked.
+    Only tiles that get closer to a seed through the opened tile are visited.
+    """
+    if not is_seed:
+        best = -1
+        for neighbor in NEIGHBORS[index]:
+            pathlength = field[neighbor]
+            if pathlength != -1 and not blocked[neighbor] and (best == -1 or pathlength < best):
+                best = pathlength
+        if best == -1:
+            return
+        field[index] = best + 1
+
+    current = deque((index,))
+    while current:
+        current_index = current.popleft()
+        next_pathlength = field[current_index] + 1
+        for neighbor in NEIGHBORS[current_index]:
+            if not blocked[neighbor] and (field[neighbor] == -1 or field[neighbor] > next_pathlength):
+                field[neighbor] = next_pathlength
+                current.append(neighbor)
+
+
+def _repair_blocked(field, blocked, index, is_seed):
+    """Updates a distance field in place after the tile at index became blocked.
+    Only tiles whose every shortest route ran through the blocked tile are recomputed.
+    """
+    if field[index] == -1:
+        return
+
+    #Find the tiles that lost all of their parents, one pathlength level at a time
+    affected = {index}
+    level = [index]
+    while level:
+        candidates = {neighbor for current_index in level for neighbor in NEIGHBORS[current_index]
+                      if not blocked[neighbor] and field[neighbor] == field[current_index] + 1}
+        level = []
+        for candidate in candidates:
+            parent_pathlength = field[candidate] - 1
+            for neighbor in NEIGHBORS[candidate]:
+                if field[neighbor] == parent_pathlength and not blocked[neighbor] and neighbor not in affected:
+                    break
+            else:
+                level.append(candidate)
+        affected.update(level)
+
+    #Blocked seeds keep their pathlength of 0, everything else we lost is searched again
+    if not is_seed:
+        field[index] = -1
+    affected.discard(index)
+    for affected_index in affected:
+        field[affected_index] = -1
+
+    buckets = {}
+    for affected_index in affected:
+        best = -1
+        for neighbor in NEIGHBORS[affected_index]:
+            pathlength = field[neighbor]
+            if pathlength != -1 and not blocked[neighbor] and (best == -1 or pathlength < best):
+                best = pathlength
+        if best != -1:
+            buckets.setdefault(best + 1, []).append(affected_index)
+    if not buckets:
+        return
+
+    pathlength = min(buckets)
+    while buckets:
+        for affected_index in buckets.pop(pathlength, ()):
+            if field[affected_index] != -1:
+                continue
+            field[affected_index] = pathlength
+            for neighbor in NEIGHBORS[affected_index]:
+                if neighbor in affected and field[neighbor] == -1:
+                    buckets.setdefault(pathlength + 1, []).append(neighbor)
+        pathlength += 1
+
+
+class Connectivity:
+    """Connected pockets and articulation points of the open tiles of an obstacle grid.
+
+    Built with one depth first search, after which asking whether a start can still reach an edge
+    with one extra tile blocked is answered from the search tree instead of by pathing.
+
+    Attributes :
+        * pocket (array): The pocket number of every open tile index, -1 for blocked tiles
+        * pocket_edges (list): For every pocket, how many open tiles of each of the four edges it holds
+
+    """
+    def __init__(self, blocked):
+        self.pocket = array('h', [-1]) * NUM_TILES
+        self.pocket_edges = []
+        self._discovered = discovered = array('h', [-1]) * NUM_TILES
+        self._finished = finished = array('h', [0]) * NUM_TILES
+        self._low = low = array('h', [0]) * NUM_TILES
+        self._parent = parent = array('h', [-1]) * NUM_TILES
+        #Open edge tiles of each edge inside every tile's search subtree
+        self._subtree_edges = subtree_edges = [array('h', [0]) * NUM_TILES for _ in EDGE_INDICES]
+        edge_sets = [set(edge) for edge in EDGE_INDICES]
+
+        timer = 0
+        for root in IN_BOUNDS_INDICES:
+            if blocked[root] or discovered[root] != -1:
+                continue
+            pocket_number = len(self.pocket_edges)
+            edge_counts = [0] * len(EDGE_INDICES)
+            discovered[root] = low[root] = timer
+            timer += 1
+            self.pocket[root] = pocket_number
+            stack = [(root, iter(NEIGHBORS[root]))]
+            while stack:
+                current_index, neighbors = stack[-1]
+                for neighbor in neighbors:
+                    if blocked[neighbor]:
+                        continue
+                    if discovered[neighbor] == -1:
+                        parent[neighbor] = current_index
+                        discovered[neighbor] = low[neighbor] = timer
+                        timer += 1
+                        self.pocket[neighbor] = pocket_number
+                        stack.append((neighbor, iter(NEIGHBORS[neighbor])))
+                        break
+                    if neighbor != parent[current_index] and discovered[neighbor] < low[current_index]:
+                        low[current_index] = discovered[neighbor]
+                else:
+                    stack.pop()
+                    finished[current_index] = timer
+                    parent_index = parent[current_index]
+                    for edge, edge_set in enumerate(edge_sets):
+                        if current_index in edge_set:
+                            subtree_edges[edge][current_index] += 1
+                            edge_counts[edge] += 1
+                        if parent_index != -1:
+                            subtree_edges[edge][parent_index] += subtree_edges[edge][current_index]
+                    if parent_index != -1 and low[current_index] < low[parent_index]:
+                        low[parent_index] = low[current_index]
+            self.pocket_edges.append(edge_counts)
+        self._edge_sets = edge_sets
+
+    def can_reach_edge(self, start_index, edge, blocked_index=None):
+        """Checks if a unit at start_index can reach an open tile of edge
+
+        Args:
+            start_index: The tile index of the unit
+            edge: The target edge, 0 to 3 in the same order as GameMap.get_edges
+            blocked_index: A tile index to treat as blocked on top of the grid, or None
+
+        Returns:
+            True if at least one open tile of the edge is in the unit's pocket
+
+        """
+        pocket_number = self.pocket[start_index]
+        if pocket_number == -1 or start_index == blocked_index:
+            return False
+        reachable = self.pocket_edges[pocket_number][edge]
+        if blocked_index is None or self.pocket[blocked_index] != pocket_number:
+            return reachable > 0
+
+        #Blocking an articulation point cuts off every child subtree that has no way around it
+        discovered = self._discovered
+        subtree_edges = self._subtree_edges[edge]
+        if blocked_index in self._edge_sets[edge]:
+            reachable -= 1
+        for child in NEIGHBORS[blocked_index]:
+            if self._parent[child] != blocked_index or self._low[child] < discovered[blocked_index]:
+                continue
+            if discovered[child] <= discovered[start_index] < self._finished[child]:
+                return subtree_edges[child] > 0
+            reachable -= subtree_edges[child]
+        return reachable > 0
+
+
+class PathingContext:
+    """The obstacle grid of one board state, shared by every path query made against it.
+
+    GameState builds one lazily and registers it as a listener on its GameMap, so
+    add_unit, remove_unit and item assignment patch the grid instead of forcing a rebuild.
+    The distance fields used on the current grid are kept and repaired in place when a single
+    tile flips, so trying a placement only costs work around the tiles whose paths it changes.
 
     Attributes :
-        * visited_idealness (bool): Have we visited this node during the idealness search step?
-        * visited_validate (bool): Have we visited this node during the validation step?
-        * blocked (bool): Is there a structures at this node's location
-        * pathlength: The distance between this node and the target location
+        * blocked (bytearray): 1 for every tile index holding a structure
+        * fields (dict): The distance fields valid for the current grid, keyed by their seed tile indices
 
     """
-    def __init__(self):
-        self.visited_idealness = False
-        self.visited_validate = False
-        self.blocked = False
-        self.pathlength = -1
+    MAX_FIELDS = 8
+
+    def __init__(self, game_map=None):
+        """Builds the obstacle grid from the structures currently on game_map
+
+        Args:
+            game_map: The GameMap to read structures from. The grid starts empty if None.
+
+        """
+        self.blocked = bytearray(NUM_TILES)
+        self.fields = {}
+        self._grid_key = None
+        self._connectivity = None
+        if game_map is None:
+            return
+        for index in game_map.get_structure_indices():
+            self.blocked[index] = 1
+
+    def grid_key(self):
+        """A compact hash of the obstacle grid, used to key cached distance fields.
+        Identical grids give identical keys, across game states and turns.
+        """
+        if self._grid_key is None:
+            self._grid_key = hashlib.blake2b(self.blocked, digest_size=16).digest()
+        return self._grid_key
+
+    def set_blocked(self, location, blocked):
+        """Marks a single location as blocked or open
+
+        Args:
+            location: The [x, y] location that changed
+            blocked: True if a structure now occupies the location
+
+        """
+        index = location_to_index(location)
+        value = 1 if blocked else 0
+        if self.blocked[index] != value:
+            self.blocked[index] = value
+            self._grid_key = None
+            self._connectivity = None
+            self._repair_fields(index, value)
+
+    def get_connectivity(self):
+        """Gets the pocket and articulation point data of the current grid, building it on first use
+        """
+        if self._connectivity is None:
+            self._connectivity = Connectivity(self.blocked)
+        return self._connectivity
+
+    def add_field(self, seeds, field):
+        """Remembers a distance field computed on the current grid so it can be repaired instead of recomputed
+        """
+        self.fields[seeds] = field
+        if len(self.fields) > self.MAX_FIELDS:
+            del self.fields[next(iter(self.fields))]
+
+    def _repair_fields(self, index, blocked):
+        repair = _repair_blocked if blocked else _repair_opened
+        fields = {}
+        for seeds, field in self.fields.items():
+            #Fields may also live in the distance field cache, so repair a copy
+            field = array('h', field)
+            repair(field, self.blocked, index, index in seeds)
+            fields[seeds] = field
+        self.fields = fields
+
+    def tile_changed(self, x, y, units):
+        """GameMap listener callback, called after the units at [x, y] change
+        """
+        self.set_blocked([x, y], any(unit.stationary for unit in units))
+
+
+class DistanceFieldCache:
+    """Bounded LRU cache of distance fields.
+
+    A distance field only depends on the obstacle grid and the tiles it was searched from,
+    so it is keyed by (PathingContext.grid_key(), seed tile indices) and can be reused by any
+    game state with the same structures, including on later turns.
+
+    Attributes :
+        * maxsize (int): The most distance fields kept before the least recently used is dropped
+        * hits (int): Lookups answered from the cache
+        * misses (int): Lookups that had to run a breadth first search
+        * build_time (float): Seconds spent running those searches
+
+    """
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._fields = OrderedDict()
+        self.reset_stats()
+
+    def get(self, key, build):
+        """Gets the distance field for key, calling build() to compute and store it on a miss
+        """
+        field = self._fields.get(key)
+        if field is not None:
+            self._fields.move_to_end(key)
+            self.hits += 1
+            return field
+
+        self.misses += 1
+        start_time = time.perf_counter()
+        field = build()
+        self.build_time += time.perf_counter() - start_time
+        self._fields[key] = field
+        if len(self._fields) > self.maxsize:
+            self._fields.popitem(last=False)
+        return field
+
+    def clear(self):
+        """Drops every cached distance field. Counters are kept, see reset_stats
+        """
+        self._fields.clear()
+
+    def reset_stats(self):
+        """Zeroes the hit, miss and build time counters
+        """
+        self.hits = 0
+        self.misses = 0
+        self.build_time = 0.0
+
+    def stats(self):
+        """Gets the cache counters
+
+        Returns:
+            A dict with hits, misses, size, build_time and saved_time, an estimate of
+            the search time the hits avoided based on the average miss
+        """
+        average = self.build_time / self.misses if self.misses else 0.0
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._fields),
+                "build_time": self.build_time, "saved_time": self.hits * average}
+
+"""
+Shared by every ShortestPathFinder unless one is given its own cache, so
+fields survive from one turn's GameState to the next.
+"""
+DISTANCE_FIELD_CACHE = DistanceFieldCache()
+
 
 """
 This class helps with pathfinding. We guarantee the results will
@@ -33,32 +356,42 @@ class ShortestPathFinder:
         * VERTICAL (int): A constant representing a vertical movement
 
         * game_state (:obj: GameState): The current gamestate
-        * game_map (:obj: GameMap): The current gamemap
+        * field_cache (:obj: DistanceFieldCache): Where distance fields are looked up before searching
+        * blocked (bytearray): 1 for every tile index holding a structure
+        * pathlength (array): The distance between each tile and the target location, -1 if unreached
+        * visited_idealness (bytearray): 1 for every tile reached by the last idealness search
 
     """
-    def __init__(self):
+    def __init__(self, field_cache=None):
         self.HORIZONTAL = 1
         self.VERTICAL = 2
         self.initialized = False
+        self.field_cache = DISTANCE_FIELD_CACHE if field_cache is None else field_cache
 
-    def initialize_map(self, game_state):
+    def initialize_map(self, game_state, context=None):
         """Initializes the map
 
         Args:
             game_state: A GameState object representing the gamestate we want to traverse
+            context: A PathingContext for game_state. A new one is built from game_state.game_map if None.
         """
-        #Initialize map 
+        #Initialize map
         self.initialized = True
         self.game_state = game_state
-        self.game_map = [[Node() for x in range(self.game_state.ARENA_SIZE)] for y in range(self.game_state.ARENA_SIZE)]
+        if context is None:
+            context = PathingContext(game_state.game_map)
+        self.context = context
+        self.blocked = context.blocked
+        self.pathlength = array('h', [-1]) * NUM_TILES
 
-    def navigate_multiple_endpoints(self, start_point, end_points, game_state):
+    def navigate_multiple_endpoints(self, start_point, end_points, game_state, context=None):
         """Finds the path a unit would take to reach a set of endpoints
 
         Args:
             * start_point: The starting location of the unit
             * end_points: The end points of the unit, should be a list of edge locations
             * game_state: The current game state
+            * context: A PathingContext holding the obstacle grid of game_state. Built from scratch if None.
 
         Returns:
             The path a unit at start_point would take when trying to reach end_points given the current game state.
@@ -68,58 +401,95 @@ class ShortestPathFinder:
         if game_state.contains_stationary_unit(start_point):
             return
 
-        #Initialize map 
-        self.initialize_map(game_state)
-        #Fill in walls
-        for location in self.game_state.game_map:
-            if self.game_state.contains_stationary_unit(location):
-                self.game_map[location[0]][location[1]].blocked = True
-        #Do pathfinding
-        ideal_endpoints = self._idealness_search(start_point, end_points)
-        self._validate(ideal_endpoints, end_points)
-        return self._get_path(start_point, end_points)
+        return self.navigate_multiple_starts([start_point], end_points, game_state, context)[0]
+
+    def navigate_multiple_starts(self, start_points, end_points, game_state, context=None):
+        """Finds the paths units at several start points would take to reach the same set of endpoints
+
+        The validation search only depends on the target, not on the start. Every start that can reach
+        an endpoint shares one search from the endpoints, and starts sealed into the same pocket share
+        one search from that pocket's self destruct location.
+
+        Args:
+            * start_points: The starting locations of the units
+            * end_points: The end points of the units, should be a list of edge locations
+            * game_state: The current game state
+            * context: A PathingContext holding the obstacle grid of game_state. Built from scratch if None.
+
+        Returns:
+            A list with the path for each start point, in the same order. Entries are None for blocked start points.
+
+        """
+        #Initialize map, reusing the obstacle grid from context if we have one
+        self.initialize_map(game_state, context)
+        blocked = self.blocked
+        edge_seeds = tuple(location_to_index(location) for location in end_points)
+        pocket_ideal = {}
+
+        paths = []
+        for start_point in start_points:
+            start_index = location_to_index(start_point)
+            if blocked[start_index]:
+                paths.append(None)
+                continue
+
+            #Do pathfinding
+            seeds = edge_seeds
+            if self._get_distance_field(edge_seeds)[start_index] == -1:
+                #No endpoint can reach us, so find the best self destruct location in our pocket
+                if start_index not in pocket_ideal:
+                    ideal_tile = self._idealness_search(start_point, end_points)
+                    visited = self.visited_idealness
+                    for index in IN_BOUNDS_INDICES:
+                        if visited[index]:
+                            pocket_ideal[index] = ideal_tile
+                    pocket_ideal[start_index] = ideal_tile
+                seeds = (pocket_ideal[start_index],)
+
+            self.pathlength = self._get_distance_field(seeds)
+            paths.append(self._get_path(start_point, end_points))
+        return paths
 
     def _idealness_search(self, start, end_points):
         """
-        Finds the most ideal tile in our 'pocket' of pathable space. 
-        The edge if it is available, or the best self destruct location otherwise
+        Finds the most ideal tile in our 'pocket' of pathable space.
+        The edge if it is available, or the best self destruct location otherwise.
+        Returns the tile index of that location.
         """
-        current = queue.Queue()
-        current.put(start)
-        best_idealness = self._get_idealness(start, end_points)
-        self.game_map[start[0]][start[1]].visited_idealness = True
-        most_ideal = start
-
-        while not current.empty():
-            search_location = current.get()
-            for neighbor in self._get_neighbors(search_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+        end_indices = set(map(location_to_index, end_points))
+        idealness = IDEALNESS[tuple(self._get_direction_from_endpoints(end_points))]
+        blocked = self.blocked
+
+        start_index = location_to_index(start)
+        visited = bytearray(NUM_TILES)
+        self.visited_idealness = visited
+        if start_index in end_indices:
+            return start_index
+        visited[start_index] = 1
+        best_idealness = idealness[start_index]
+        most_ideal = start_index
+
+        current = deque((start_index,))
+        while current:
+            for neighbor in NEIGHBORS[current.popleft()]:
+                if blocked[neighbor] or visited[neighbor]:
                     continue
-
-                x, y = neighbor
-                current_idealness = self._get_idealness(neighbor, end_points)
-
-                if current_idealness > best_idealness:
-                    best_idealness = current_idealness
+                # Any reachable endpoint is perfectly ideal, so there is nothing left to find
+                if neighbor in end_indices:
+                    return neighbor
+                if idealness[neighbor] > best_idealness:
+                    best_idealness = idealness[neighbor]
                     most_ideal = neighbor
-
-                if not self.game_map[x][y].visited_idealness and not self.game_map[x][y].blocked:
-                    self.game_map[x][y].visited_idealness = True
-                    current.put(neighbor)
+                visited[neighbor] = 1
+                current.append(neighbor)
 
         return most_ideal
 
-    def _get_neighbors(self, location):
-        """Get the locations adjacent to a location
-        """
-        x, y = location
-        return [[x, y + 1], [x, y - 1], [x + 1, y], [x - 1, y]]
-
     def _get_direction_from_endpoints(self, end_points):
         """Prints a message to the games debug output
 
         Args:
-            * end_points: A set of endpoints, should be an edge 
+            * end_points: A set of endpoints, should be an edge
 
         Returns:
             A direction [x,y] representing the edge. For example, [1,1] for the top right and [-1, 1] for the top left
@@ -128,165 +498,124 @@ class ShortestPathFinder:
         point = end_points[0]
         x, y = point
         direction = [1, 1]
-        if x < self.game_state.HALF_ARENA:
+        if x < HALF_ARENA:
            direction[0] = -1
-        if y < self.game_state.HALF_ARENA:
+        if y < HALF_ARENA:
             direction[1] = -1
         return direction
 
-    def _get_idealness(self, location, end_points):
-        """Get the idealness of a tile, the reachable tile the unit most wants to path to.
-        Better self destruct locations are more ideal. The endpoints are perfectly ideal. 
-
-        Returns:
-            A location the unit will attempt to reach
+    def _get_distance_field(self, seeds):
+        """Gets the distance field for seeds, preferring the fields the pathing context keeps
+        repaired for its current grid, then the field cache, and searching on a miss.
+        Fields may be shared with other queries and must not be modified.
         """
-        if location in end_points:
-            return sys.maxsize
-
-        direction = self._get_direction_from_endpoints(end_points)
-
-        idealness = 0
-        if direction[1] == 1:
-            idealness += 28 * location[1]
-        else: 
-            idealness += 28 * (27 - location[1])
-        if direction[0] == 1:
-            idealness += location[0]
-        else: 
-            idealness += (27 - location[0])
+        field = self.context.fields.get(seeds)
+        if field is None:
+            field = self.field_cache.get((self.context.grid_key(), seeds), lambda: self._distance_field(seeds))
+            self.context.add_field(seeds, field)
+        return field
 
-        return idealness
-
-    def _validate(self, ideal_tile, end_points):
-        """Breadth first search of the grid, setting the pathlengths of each node
+    def _distance_field(self, seeds):
+        """Breadth first search outwards from the seed tile indices over the current obstacle grid
 
+        Returns:
+            An array with the pathlength of every tile index, -1 for tiles that cannot reach a seed
         """
-        #VALDIATION
-        #Add our most ideal tiles to current
-        current = queue.Queue()
-        if ideal_tile in end_points:
-            for location in end_points:
-               current.put(location)
-               #Set current pathlength to 0
-               self.game_map[location[0]][location[1]].pathlength = 0
-               self.game_map[location[0]][location[1]].visited_validate = True
-        else:
-            current.put(ideal_tile)
-            self.game_map[ideal_tile[0]][ideal_tile[1]].pathlength = 0
-            self.game_map[ideal_tile[0]][ideal_tile[1]].visited_validate = True
+        pathlength = array('h', [-1]) * NUM_TILES
+        blocked = self.blocked
+        for index in seeds:
+            pathlength[index] = 0
 
         #While current is not empty
-        while not current.empty():
-            current_location = current.get()
-            current_node = self.game_map[current_location[0]][current_location[1]]
-            for neighbor in self._get_neighbors(current_location):
-                if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
-                    continue
-
-                neighbor_node = self.game_map[neighbor[0]][neighbor[1]]
-                if not neighbor_node.visited_validate and not current_node.blocked:
-                    neighbor_node.pathlength = current_node.pathlength + 1
-                    neighbor_node.visited_validate = True
-                    current.put(neighbor)
-
-        #debug_write("Print after validate")
-        #self.print_map()
-        return
+        current = deque(seeds)
+        while current:
+            current_index = current.popleft()
+            # Blocked endpoints are still valid targets, but nothing paths through them
+            if blocked[current_index]:
+                continue
+            next_pathlength = pathlength[current_index] + 1
+            for neighbor in NEIGHBORS[current_index]:
+                if not blocked[neighbor] and pathlength[neighbor] == -1:
+                    pathlength[neighbor] = next_pathlength
+                    current.append(neighbor)
+        return pathlength
 
     def _get_path(self, start_point, end_points):
         """Once all nodes are validated, and a target is found, the unit can path to its target
 
         """
         #GET THE PATH
+        direction = self._get_direction_from_endpoints(end_points)
+        pathlength = self.pathlength
         path = [start_point]
-        current = start_point
+        current = location_to_index(start_point)
         move_direction = 0
 
-        while not self.game_map[current[0]][current[1]].pathlength == 0:
-            #debug_write("current tile {} has cost {}".format(current, self.game_map[current[0]][current[1]].pathlength))
-            next_move = self._choose_next_move(current, move_direction, end_points)
-            #debug_write(next_move)
+        while not pathlength[current] == 0:
+            next_move = self._choose_next_move(current, move_direction, direction)
 
-            if current[0] == next_move[0]:
+            if TILE_X[current] == TILE_X[next_move]:
                 move_direction = self.VERTICAL
             else:
                 move_direction = self.HORIZONTAL
-            path.append(next_move)
+            path.append([TILE_X[next_move], TILE_Y[next_move]])
             current = next_move
-        
+
         #debug_write(path)
         return path
-  
-    def _choose_next_move(self, current_point, previous_move_direction, end_points):
-        """Given the current location and adjacent locations, return the best 'next step' for a given unit to take
+
+    def _choose_next_move(self, current_point, previous_move_direction, direction):
+        """Given the current tile index and adjacent tiles, return the index of the best 'next step' for a given unit to take
         """
-        neighbors = self._get_neighbors(current_point)
-        #debug_write("Unit at {} previously moved {} and has these neighbors {}".format(current_point, previous_move_direction, neighbors))
+        pathlength = self.pathlength
+        blocked = self.blocked
 
         ideal_neighbor = current_point
-        best_pathlength = self.game_map[current_point[0]][current_point[1]].pathlength
-        for neighbor in neighbors:
-            #debug_write("Comparing champ {} and contender {}".format(ideal_neighbor, neighbor))
-            if not self.game_state.game_map.in_arena_bounds(neighbor) or self.game_map[neighbor[0]][neighbor[1]].blocked:
+        best_pathlength = pathlength[current_point]
+        for neighbor in NEIGHBORS[current_point]:
+            if blocked[neighbor]:
                 continue
 
-            new_best = False
-            x, y = neighbor
-            current_pathlength = self.game_map[x][y].pathlength
+            current_pathlength = pathlength[neighbor]
 
             #Filter by pathlength
             if current_pathlength > best_pathlength:
                 continue
-            elif current_pathlength < best_pathlength:
-                #debug_write("Contender has better pathlength at {} vs champs {}".format(current_pathlength, best_pathlength))
-                new_best = True
 
             #Filter by direction based on prev move
-            if not new_best and not self._better_direction(current_point, neighbor, ideal_neighbor, previous_move_direction, end_points):
+            if current_pathlength == best_pathlength and not self._better_direction(current_point, neighbor, ideal_neighbor, previous_move_direction, direction):
                 continue
 
             ideal_neighbor = neighbor
             best_pathlength = current_pathlength
 
-        #debug_write("Gave unit at {} new tile {}".format(current_point, ideal_neighbor))
         return ideal_neighbor
 
-    def _better_direction(self, prev_tile, new_tile, prev_best, previous_move_direction, end_points):
-        """Compare two tiles and return True if the unit would rather move to the new one
+    def _better_direction(self, prev_tile, new_tile, prev_best, previous_move_direction, direction):
+        """Compare two tile indices and return True if the unit would rather move to the new one
 
         """
+        prev_x, prev_y = TILE_X[prev_tile], TILE_Y[prev_tile]
+        new_x, new_y = TILE_X[new_tile], TILE_Y[new_tile]
+        best_x, best_y = TILE_X[prev_best], TILE_Y[prev_best]
+
         #True if we are moving in a different direction than prev move and prev is not
         #If we previously moved horizontal, and now one of our options has a different x position then the other (the two options are not up/down)
-        if previous_move_direction == self.HORIZONTAL and not new_tile[0] == prev_best[0]:
+        if previous_move_direction == self.HORIZONTAL and not new_x == best_x:
             #We want to go up now. If we have not changed our y, we are not going up
-            if prev_tile[1] == new_tile[1]:
-                return False 
-            return True
-        if previous_move_direction == self.VERTICAL and not new_tile[1] == prev_best[1]:
-            if prev_tile[0] == new_tile[0]:
-                #debug_write("contender {} has the same x coord as prev tile {} so we will keep best move {}".format(new_tile, prev_tile, prev_best))
-                return False
-            return True
-        if previous_move_direction == 0: 
-            if prev_tile[1] == new_tile[1]: 
-                return False
-            return True
-        
-        #To make it here, both moves are on the same axis 
-        direction = self._get_direction_from_endpoints(end_points)
-        if new_tile[1] == prev_best[1]: #If they both moved horizontal...
-            if direction[0] == 1 and new_tile[0] > prev_best[0]: #If we moved right and right is our direction, we moved towards our direction
-                return True 
-            if direction[0] == -1 and new_tile[0] < prev_best[0]: #If we moved left and left is our direction, we moved towards our direction
-                return True 
-            return False 
-        if new_tile[0] == prev_best[0]: #If they both moved vertical...
-            if direction[1] == 1 and new_tile[1] > prev_best[1]: #If we moved up and up is our direction, we moved towards our direction
-                return True
-            if direction[1] == -1 and new_tile[1] < prev_best[1]: #If we moved down and down is our direction, we moved towards our direction
-                return True
-            return False
+            return not prev_y == new_y
+        if previous_move_direction == self.VERTICAL and not new_y == best_y:
+            return not prev_x == new_x
+        if previous_move_direction == 0:
+            return not prev_y == new_y
+
+        #To make it here, both moves are on the same axis
+        if new_y == best_y: #If they both moved horizontal...
+            #True if we moved towards the horizontal direction of our target edge
+            return (direction[0] == 1 and new_x > best_x) or (direction[0] == -1 and new_x < best_x)
+        if new_x == best_x: #If they both moved vertical...
+            #True if we moved towards the vertical direction of our target edge
+            return (direction[1] == 1 and new_y > best_y) or (direction[1] == -1 and new_y < best_y)
         return True
 
     def print_map(self):
@@ -299,9 +628,9 @@ class ShortestPathFinder:
 
         for y in range(28):
             for x in range(28):
-                node = self.game_map[x][28 - y - 1]
-                if not node.blocked and not node.pathlength == -1:
-                    self._print_justified(node.pathlength)
+                index = x * ARENA_SIZE + 28 - y - 1
+                if not self.blocked[index] and not self.pathlength[index] == -1:
+                    self._print_justified(self.pathlength[index])
                 else:
                     sys.stderr.write("   ")
             debug_write("")
@@ -0,0 +1,238 @@
+import math
+import random
+import time
+
+from .game_state import GameState
+from .game_config import GameConfig
+from .simulator import ActionPhaseSimulator
+
+
+class TurnPlan:
+    """A candidate turn, the structures to build and the mobile units to deploy
+
+    Attributes :
+        * build_set (int): The index into the build sets given to TurnPlanner.plan
+        * builds (list): [unit_type, [x, y], upgrade] entries, attempted in order
+        * deploys (list): (unit_type, [x, y], count) groups of mobile units
+        * score (float): How the planner rated the simulated outcome, None if never simulated
+        * result (SimulationResult): The simulated outcome, None if never simulated
+
+    """
+    def __init__(self, build_set, builds, deploys, score=None, result=None):
+        self.build_set = build_set
+        self.builds = builds
+        self.deploys = deploys
+        self.score = score
+        self.result = result
+
+    def apply(self, game_state):
+        """Attempts every build and deploy of the plan on game_state, ready for submit_turn
+
+        Args:
+            game_state: The GameState of the current turn
+
+        """
+        for unit_type, location, upgrade in self.builds:
+            game_state.attempt_spawn(unit_type, location)
+            if upgrade:
+                game_state.attempt_upgrade(location)
+        for unit_type, location, count in self.deploys:
+            game_state.attempt_spawn(unit_type, location, count)
+
+    def __repr__(self):
+        return "build set: {} deploys: {} score: {}".format(self.build_set, self.deploys, self.score)
+
+
+class TurnPlanner:
+    """Searches candidate turns with the ActionPhaseSimulator and keeps the best one found before a deadline.
+
+    Candidates pair a build set with up to two groups of mobile units on our edges. The search runs in stages,
+    each widening the last: every build set with no deploy, every unit type sent all in from every spawn
+    point (coarse spacing first), mixes of two types around the best beam_width candidates, then random
+    candidates until the deadline. The deadline is checked before every simulation, so plan returns promptly
+    with the best candidate so far at any point.
+
+    Candidates are planned from the state at the start of the turn, GameState.serialized_string, so
+    anything already attempted on the game_state passed to plan is ignored.
+
+    Attributes :
+        * config (JSON): Contains information about the current game rules
+        * unit_types (list): The mobile unit types candidates may deploy
+        * beam_width (int): How many of the best single type candidates are expanded into mixes
+        * health_weight (float): The SP one point of health is worth when scoring
+        * evaluated (int): The number of candidates simulated by the last call to plan
+
+    """
+    MAX_MISSES = 100
+
+    def __init__(self, config, unit_types=None, beam_width=4, health_weight=3.0, seed=None):
+        """Sets up the planner for a game
+
+        Args:
+            config (JSON): Contains information about the game, or its GameConfig
+            unit_types: The mobile unit types to try, SCOUT, DEMOLISHER and INTERCEPTOR if None
+            beam_width: How many of the best single type candidates are expanded into mixes
+            health_weight: The SP one point of health is worth when scoring
+            seed: Seed for the random candidates, for repeatable plans
+
+        """
+        game_config = GameConfig.get(config)
+        self.config = game_config.config
+        self.unit_types = unit_types or [game_config.SCOUT, game_config.DEMOLISHER, game_config.INTERCEPTOR]
+        self.beam_width = beam_width
+        self.health_weight = health_weight
+        self.evaluated = 0
+        self._random = random.Random(seed)
+        self._simulator = ActionPhaseSimulator(game_config)
+        self._structure_cost = {unit_type: spec.cost[game_config.SP] for unit_type, spec in game_config.unit_specs.items()}
+
+    def score(self, result):
+        """Rates a SimulationResult, higher is better. Override to change what the planner optimizes.
+
+        The default values health taken and dealt at health_weight SP per point, plus the SP value of
+        enemy structures destroyed minus that of our own.
+
+        Args:
+            result: A SimulationResult
+
+        Returns:
+            The score as a float
+
+        """
+        score = self.health_weight * (result.health_delta[0] - result.health_delta[1])
+        for unit_type, location, player_index in result.destroyed:
+            value = self._structure_cost.get(unit_type, 0)
+            score += value if player_index == 1 else -value
+        return score
+
+    def plan(self, game_state, build_sets=None, budget=1.0, spawn_points=None, deadline=None, seed=None):
+        """Finds the best turn it can within a time budget
+
+        Args:
+            game_state: The GameState of the current turn
+            build_sets: A list of build orders, each a list of [unit_type, [x, y], upgrade] entries. Every
+                candidate uses one of them, or builds nothing if None
+            budget: Seconds to search for
+            spawn_points: The locations deploys may use, every free location on our edges if None
+            deadline: A time.time() to stop by as well, for a search that started in another process
+            seed: Reseeds the random candidates first, for repeatable plans
+
+        Returns:
+            The best TurnPlan found. If the deadline passes before any simulation, the first build set with no deploy.
+
+        """
+        if deadline is not None:
+            budget = min(budget, deadline - time.time())
+        deadline = time.perf_counter() + budget
+        if seed is not None:
+            self._random.seed(seed)
+        build_sets = build_sets or [[]]
+        self.evaluated = 0
+        states = [None] * len(build_sets)
+        evaluated = {}
+        best = TurnPlan(0, build_sets[0], [])
+
+        def evaluate(build_set, deploys):
+            nonlocal best
+            key = (build_set, tuple((unit_type, tuple(location), count) for unit_type, location, count in deploys))
+            if key in evaluated:
+                return evaluated[key]
+            if states[build_set] is None:
+                states[build_set] = self._build_state(game_state, build_sets[build_set])
+            state = states[build_set]
+            if not self._affordable(state, deploys):
+                return None
+            for unit_type, location, count in deploys:
+                for _ in range(count):
+                    state.game_map.add_unit(unit_type, location, 0)
+            result = self._simulator.simulate(state)
+            for unit_type, location, count in deploys:
+                state.game_map.remove_unit(location)
+            self.evaluated += 1
+
+            plan = evaluated[key] = TurnPlan(build_set, build_sets[build_set], deploys, self.score(result), result)
+            if best.score is None or plan.score > best.score:
+                best = plan
+            return plan
+
+        def out_of_time():
+            return time.perf_counter() >= deadline
+
+        if spawn_points is None:
+            spawn_points = self.get_spawn_points(game_state)
+        #Coarse spacing first so an early deadline still covers the whole edge
+        spawn_points = spawn_points[::4] + spawn_points[2::4] + spawn_points[1::2]
+
+        for build_set in range(len(build_sets)):
+            if out_of_time():
+                return best
+            evaluate(build_set, [])
+
+        singles = []
+        counts = {unit_type: self._count_affordable(game_state, unit_type) for unit_type in self.unit_types}
+        for location in spawn_points:
+            for unit_type in self.unit_types:
+                for build_set in range(len(build_sets)):
+                    if out_of_time():
+                        return best
+                    if counts[unit_type]:
+                        plan = evaluate(build_set, [(unit_type, location, counts[unit_type])])
+                        if plan is not None:
+                            singles.append(plan)
+
+        singles.sort(key=lambda plan: plan.score, reverse=True)
+        for plan in singles[:self.beam_width]:
+            unit_type, location, count = plan.deploys[0]
+            for other_type in self.unit_types:
+                if other_type == unit_type:
+                    continue
+                for other_location in [location] + [other.deploys[0][1] for other in singles[:self.beam_width]]:
+                    if out_of_time():
+                        return best
+                    evaluate(plan.build_set, self._split(game_state, unit_type, location, other_type, other_location))
+
+        #Random candidates until the deadline, or until they stop turning up anything new
+        misses = 0
+        while spawn_points and misses < self.MAX_MISSES and not out_of_time():
+            unit_type, other_type = self._random.choice(self.unit_types), self._random.choice(self.unit_types)
+            location, other_location = self._random.choice(spawn_points), self._random.choice(spawn_points)
+            deploys = self._split(game_state, unit_type, location, other_type, other_location, self._random.random())
+            evaluated_before = self.evaluated
+            evaluate(self._random.randrange(len(build_sets)), deploys)
+            misses = misses + 1 if self.evaluated == evaluated_before else 0
+        return best
+
+    def _build_state(self, game_state, builds):
+        state = GameState(game_state.config, game_state.serialized_string, game_state._state)
+        state.suppress_warnings(True)
+        TurnPlan(None, builds, []).apply(state)
+        return state
+
+    def get_spawn_points(self, game_state):
+        """Gets the locations on our edges not blocked by a structure at the start of the turn
+        """
+        game_map = game_state.game_map
+        locations = game_map.get_edge_locations(game_map.BOTTOM_LEFT) + game_map.get_edge_locations(game_map.BOTTOM_RIGHT)
+        return [location for location in locations if not game_state.contains_stationary_unit(location)]
+
+    def _count_affordable(self, game_state, unit_type):
+        return int(math.floor(game_state.get_resource(game_state.MP) / game_state.type_cost(unit_type)[game_state.MP]))
+
+    def _affordable(self, state, deploys):
+        mp = sum(state.type_cost(unit_type)[state.MP] * count for unit_type, location, count in deploys)
+        return all(not state.contains_stationary_unit(location) for unit_type, location, count in deploys) and \
+            mp <= state.get_resource(state.MP)
+
+    def _split(self, game_state, unit_type, location, other_type, other_location, fraction=0.5):
+        """Spends fraction of our MP on unit_type at location and the rest on other_type at other_location
+        """
+        mp = game_state.get_resource(game_state.MP)
+        count = int(math.floor(mp * fraction / game_state.type_cost(unit_type)[game_state.MP]))
+        mp -= count * game_state.type_cost(unit_type)[game_state.MP]
+        other_count = int(math.floor(mp / game_state.type_cost(other_type)[game_state.MP]))
+        deploys = []
+        if count:
+            deploys.append((unit_type, location, count))
+        if other_count:
+            deploys.append((other_type, other_location, other_count))
+        return deploys
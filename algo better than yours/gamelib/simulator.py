@@ -0,0 +1,508 @@
+from array import array
+
+from .navigation import ShortestPathFinder, PathingContext
+from .game_config import GameConfig
+from .geometry import ARENA_SIZE, HALF_ARENA, NUM_TILES, TILE_X, TILE_Y, IN_BOUNDS_INDICES, EDGE_INDICES, \
+    EDGE_TILE_SETS, DISTANCE, tiles_in_range, tile_set_in_range
+
+# The pathing end points of each edge, and a flag per tile index for the tiles on it. Shared by every simulator.
+_EDGE_END_POINTS = [[[TILE_X[index], TILE_Y[index]] for index in edge] for edge in EDGE_INDICES]
+_EDGE_MASKS = [bytes(1 if index in edge else 0 for index in range(NUM_TILES)) for edge in EDGE_TILE_SETS]
+
+
+class SimulationResult:
+    """The outcome of one simulated action phase
+
+    Attributes :
+        * health_delta ([float, float]): Change in health for [you, your opponent]
+        * sp_delta ([float, float]): Change in SP for [you, your opponent], including what the pending builds cost
+        * mp_delta ([float, float]): Change in MP for [you, your opponent], including what the pending deploys cost
+        * destroyed (list): (unit_type, [x, y], player_index) for every structure destroyed
+        * breaches (list): ([x, y], player_index) for every mobile unit that scored
+        * frames (int): The number of frames simulated
+
+    """
+    def __init__(self):
+        self.health_delta = [0.0, 0.0]
+        self.sp_delta = [0.0, 0.0]
+        self.mp_delta = [0.0, 0.0]
+        self.destroyed = []
+        self.breaches = []
+        self.frames = 0
+
+    def __repr__(self):
+        return "health: {} SP: {} MP: {} destroyed: {} breaches: {} frames: {}".format(
+            self.health_delta, self.sp_delta, self.mp_delta, len(self.destroyed), len(self.breaches), self.frames)
+
+
+class _SimState:
+    """Struct of arrays holding every unit of one simulation.
+
+    Structures are indexed by tile index and mobile units by unit id, the order they were read off the map.
+    Unit stats live in the simulator's per type tables, looked up through the stat row type index * 2 + upgraded.
+    """
+    __slots__ = ("s_row", "s_owner", "s_health", "s_removing", "s_shield", "structures", "attackers", "supports",
+                 "threats", "shielders", "structures_in_range",
+                 "m_tile", "m_row", "m_owner", "m_health", "m_timer", "m_steps", "m_edge", "m_path", "m_step",
+                 "alive", "shielded")
+
+    def __init__(self):
+        self.s_row = array('b', [-1]) * NUM_TILES
+        self.s_owner = array('b', [-1]) * NUM_TILES
+        self.s_health = array('d', [0.0]) * NUM_TILES
+        self.s_removing = bytearray(NUM_TILES)
+        self.s_shield = array('d', [0.0]) * NUM_TILES
+        # Tile indices of standing structures, of those that attack mobile units, and of supports
+        self.structures = []
+        self.attackers = []
+        self.supports = []
+        # Tile index to the structures that attack mobile units within range of it, filled in as tiles are visited
+        self.threats = {}
+        # Tile index to the supports within shield range of it, filled in as tiles are visited
+        self.shielders = {}
+        # (tile index, stat row, owner) to the enemy structures a mobile unit there can hit, cleared when one is destroyed
+        self.structures_in_range = {}
+
+        self.m_tile = array('h')
+        self.m_row = array('b')
+        self.m_owner = array('b')
+        self.m_health = array('d')
+        self.m_timer = array('h')
+        self.m_steps = array('h')
+        self.m_edge = array('b')
+        self.m_path = []
+        self.m_step = array('h')
+        # Ids of mobile units still on the board, and support tile * id pairs already applied
+        self.alive = []
+        self.shielded = set()
+
+
+class ActionPhaseSimulator:
+    """Plays out an action phase locally, without the game engine.
+
+    Each frame, in order: supports shield friendly mobile units that are newly in range, mobile units
+    that are ready move one step along their ShortestPathFinder path, every unit attacks the target
+    GameState.get_target would choose, and units with no health left are removed. Units that reach
+    their target edge breach, and units stuck short of it self destruct. Destroyed structures reopen
+    the board and every mobile unit re-paths from where it stands.
+
+    Unit state is kept in typed arrays and per type stat tables rather than GameUnit objects,
+    so a frame is a handful of array reads per unit. This is a pure Python struct of arrays and
+    does not use NumPy: every pass loops over the few dozen live units, where NumPy call overhead
+    would cost more than it saves, and targeting has to go one unit at a time anyway. Frames in
+    which nobody can hit anything are skipped up to the next move.
+
+    This is a deterministic approximation of the engine, meant for comparing candidate turns.
+
+    Attributes :
+        * config (JSON): Contains information about the current game rules
+        * max_frames (int): Simulation stops after this many frames even if units are still moving
+
+    """
+    def __init__(self, config, max_frames=1000):
+        """Reads the unit and resource rules out of config
+
+        Args:
+            config (JSON): Contains information about the game, or its GameConfig
+            max_frames: The most frames a single simulation may run
+
+        """
+        game_config = GameConfig.get(config)
+        self.config = config = game_config.config
+        self.max_frames = max_frames
+        unit_information = config["unitInformation"]
+        hit_radius = unit_information[0]["getHitRadius"]
+        self._hit_radius = hit_radius
+        self._sp_per_damage = config["resources"].get("coresForPlayerDamage", 0)
+        self._remove_type = game_config.REMOVE
+        self._upgrade_type = game_config.UPGRADE
+        self._edge_locations = _EDGE_END_POINTS
+        self._edge_tiles = _EDGE_MASKS
+        self._pathfinder = ShortestPathFinder()
+
+        #Per type stats, indexed by stat row type index * 2 + upgraded. Ranges include the hit radius.
+        rows = 2 * len(unit_information)
+        self._type_index = game_config.UNIT_TYPE_TO_INDEX
+        self._unit_types = [None] * rows
+        self._damage_f = array('d', [0.0]) * rows
+        self._damage_i = array('d', [0.0]) * rows
+        self._attack_range = array('d', [0.0]) * rows
+        self._shield_range = array('d', [0.0]) * rows
+        self._shield_per_unit = array('d', [0.0]) * rows
+        self._shield_bonus = array('d', [0.0]) * rows
+        self._frames_per_move = array('h', [0]) * rows
+        self._max_health = array('d', [0.0]) * rows
+        self._cost = array('d', [0.0]) * rows
+        self._refund = array('d', [0.0]) * rows
+        self._breach_damage = array('d', [0.0]) * rows
+        self._self_destruct_range = array('d', [0.0]) * rows
+        self._self_destruct_tower = array('d', [0.0]) * rows
+        self._self_destruct_walker = array('d', [0.0]) * rows
+        self._self_destruct_steps = array('h', [0]) * rows
+        for index, type_config in enumerate(unit_information):
+            if "shorthand" not in type_config:
+                continue
+            upgrade = type_config.get("upgrade", {})
+            for row, upgraded in ((2 * index, False), (2 * index + 1, True)):
+                def stat(key):
+                    value = type_config.get(key, 0)
+                    return upgrade.get(key, value) if upgraded else value
+                self._unit_types[row] = type_config["shorthand"]
+                self._damage_f[row] = stat("attackDamageTower")
+                self._damage_i[row] = stat("attackDamageWalker")
+                self._attack_range[row] = stat("attackRange") + hit_radius
+                self._shield_range[row] = stat("shieldRange") + hit_radius
+                self._shield_per_unit[row] = stat("shieldPerUnit")
+                self._shield_bonus[row] = stat("shieldBonusPerY")
+                speed = stat("speed")
+                self._frames_per_move[row] = max(1, round(1 / speed)) if speed else 0
+                self._max_health[row] = stat("startHealth")
+                self._cost[row] = type_config.get("cost1", 0) + (upgrade.get("cost1", 0) if upgraded else 0)
+                self._refund[row] = stat("refundPercentage")
+                self._breach_damage[row] = type_config.get("playerBreachDamage", 1)
+                self._self_destruct_range[row] = type_config.get("selfDestructRange", 0) + hit_radius
+                self._self_destruct_tower[row] = type_config.get("selfDestructDamageTower", 0)
+                self._self_destruct_walker[row] = type_config.get("selfDestructDamageWalker", 0)
+                self._self_destruct_steps[row] = type_config.get("selfDestructStepsRequired", 0)
+
+    def precompute(self):
+        """Fills the shared range tables for every tile and every range in the config, which are otherwise
+        built as units first reach each tile. Useful before forking worker processes.
+        """
+        for radius in set(self._attack_range) | set(self._shield_range) | set(self._self_destruct_range):
+            for index in IN_BOUNDS_INDICES:
+                tile_set_in_range(index, radius)
+
+    def simulate(self, game_state):
+        """Simulates the action phase that would follow the current turn.
+
+        Every unit on game_state.game_map takes part, including structures and mobile units added by
+        attempt_spawn or GameMap.add_unit. The costs of game_state._build_stack and _deploy_stack are
+        included in the resource deltas. game_state itself is not modified.
+
+        Args:
+            game_state: The GameState to play out
+
+        Returns:
+            A SimulationResult
+
+        """
+        result = SimulationResult()
+        self._charge_stacks(game_state, result)
+        state = self._load(game_state)
+
+        context = PathingContext(game_state.game_map)
+        repath = True
+
+        while state.alive and result.frames < self.max_frames:
+            result.frames += 1
+            if state.supports:
+                self._shield(state)
+            if repath:
+                self._assign_paths(state, context)
+                repath = False
+            self._move(state, result)
+            hit = self._attack(state)
+            repath = self._remove_dead(state, context, result)
+            if not hit and not repath:
+                #Nobody could hit anything, so every frame until a unit next moves plays out the same way
+                self._skip_idle_frames(state, result)
+
+        self._refund_removals(state, result)
+        return result
+
+    def _load(self, game_state):
+        state = _SimState()
+        removals = {(x, y) for unit_type, x, y in game_state._build_stack if unit_type == self._remove_type}
+        game_map = game_state.game_map
+        #Only tiles the map's indices say are occupied, in tile order
+        for index in sorted(game_map.get_structure_indices() | game_map.get_mobile_indices()):
+            x, y = TILE_X[index], TILE_Y[index]
+            for unit in game_map[x, y]:
+                row = 2 * self._type_index[unit.unit_type] + unit.upgraded
+                if unit.stationary:
+                    state.s_row[index] = row
+                    state.s_owner[index] = unit.player_index
+                    state.s_health[index] = unit.health
+                    state.s_removing[index] = unit.pending_removal or (unit.player_index == 0 and (x, y) in removals)
+                    state.structures.append(index)
+                    if self._damage_i[row] > 0:
+                        state.attackers.append(index)
+                    distance_from_edge = y if unit.player_index == 0 else ARENA_SIZE - 1 - y
+                    shield = self._shield_per_unit[row] + self._shield_bonus[row] * distance_from_edge
+                    if shield > 0 and self._shield_range[row] > self._hit_radius:
+                        state.s_shield[index] = shield
+                        state.supports.append(index)
+                else:
+                    state.m_tile.append(index)
+                    state.m_row.append(row)
+                    state.m_owner.append(unit.player_index)
+                    state.m_health.append(unit.health)
+                    state.m_timer.append(self._frames_per_move[row])
+                    state.m_steps.append(0)
+                    state.m_edge.append(game_state.get_target_edge([x, y]))
+                    state.m_path.append(None)
+                    state.m_step.append(0)
+        state.alive = list(range(len(state.m_tile)))
+        return state
+
+    def _charge_stacks(self, game_state, result):
+        for unit_type, x, y in game_state._build_stack:
+            if unit_type == self._upgrade_type:
+                existing_unit = game_state.contains_stationary_unit([x, y])
+                if existing_unit:
+                    result.sp_delta[0] -= game_state.type_cost(existing_unit.unit_type, True)[game_state.SP]
+            elif unit_type != self._remove_type:
+                result.sp_delta[0] -= game_state.type_cost(unit_type)[game_state.SP]
+        for unit_type, x, y in game_state._deploy_stack:
+            result.mp_delta[0] -= game_state.type_cost(unit_type)[game_state.MP]
+
+    def _assign_paths(self, state, context):
+        #Units stacked on a tile heading for the same edge share one path
+        ids_by_start = {}
+        for uid in state.alive:
+            ids_by_start.setdefault((state.m_edge[uid], state.m_tile[uid]), []).append(uid)
+        starts_by_edge = {}
+        for edge, tile in ids_by_start:
+            starts_by_edge.setdefault(edge, []).append(tile)
+        for edge, tiles in starts_by_edge.items():
+            starts = [[TILE_X[tile], TILE_Y[tile]] for tile in tiles]
+            paths = self._pathfinder.navigate_multiple_starts(starts, self._edge_locations[edge], None, context)
+            for tile, path in zip(tiles, paths):
+                path = [x * ARENA_SIZE + y for x, y in path]
+                for uid in ids_by_start[edge, tile]:
+                    state.m_path[uid] = path
+                    state.m_step[uid] = 0
+
+    def _shield(self, state):
+        m_tile, m_owner, m_health, shielded = state.m_tile, state.m_owner, state.m_health, state.shielded
+        s_row, s_owner, s_shield, shielders = state.s_row, state.s_owner, state.s_shield, state.shielders
+        for uid in state.alive:
+            tile = m_tile[uid]
+            supports = shielders.get(tile)
+            if supports is None:
+                supports = shielders[tile] = [support for support in state.supports
+                                              if tile in tile_set_in_range(support, self._shield_range[s_row[support]])]
+            for support in supports:
+                if s_row[support] >= 0 and s_owner[support] == m_owner[uid]:
+                    key = uid * NUM_TILES + support
+                    if key not in shielded:
+                        m_health[uid] += s_shield[support]
+                        shielded.add(key)
+
+    def _move(self, state, result):
+        m_tile, m_row, m_health, m_timer, m_path, m_step = \
+            state.m_tile, state.m_row, state.m_health, state.m_timer, state.m_path, state.m_step
+        for uid in state.alive:
+            if m_health[uid] <= 0:
+                continue
+            frames_per_move = self._frames_per_move[m_row[uid]]
+            if not frames_per_move:
+                continue
+            timer = m_timer[uid] - 1
+            if timer > 0:
+                m_timer[uid] = timer
+                continue
+            m_timer[uid] = frames_per_move
+
+            path = m_path[uid]
+            step = m_step[uid]
+            if step + 1 < len(path):
+                step += 1
+                m_step[uid] = step
+                m_tile[uid] = path[step]
+                state.m_steps[uid] += 1
+                if step + 1 < len(path):
+                    continue
+
+            row = m_row[uid]
+            tile = m_tile[uid]
+            owner = state.m_owner[uid]
+            if self._edge_tiles[state.m_edge[uid]][tile]:
+                damage = self._breach_damage[row]
+                result.health_delta[1 - owner] -= damage
+                result.sp_delta[owner] += damage * self._sp_per_damage
+                result.breaches.append(([TILE_X[tile], TILE_Y[tile]], owner))
+            elif state.m_steps[uid] >= self._self_destruct_steps[row]:
+                self._self_destruct(state, uid)
+            #Units stuck before taking enough steps are removed without exploding
+            m_health[uid] = 0
+
+    def _self_destruct(self, state, uid):
+        row = state.m_row[uid]
+        owner = state.m_owner[uid]
+        in_range = tiles_in_range(state.m_tile[uid], self._self_destruct_range[row])
+        tower_damage = self._self_destruct_tower[row]
+        for tile in in_range:
+            if state.s_row[tile] >= 0 and state.s_owner[tile] != owner:
+                state.s_health[tile] -= tower_damage
+        in_range = tile_set_in_range(state.m_tile[uid], self._self_destruct_range[row])
+        walker_damage = self._self_destruct_walker[row]
+        m_tile, m_owner, m_health = state.m_tile, state.m_owner, state.m_health
+        for other in state.alive:
+            if m_owner[other] != owner and m_health[other] > 0 and m_tile[other] in in_range:
+                m_health[other] -= walker_damage
+
+    def _attack(self, state):
+        m_tile, m_owner, m_health, m_row = state.m_tile, state.m_owner, state.m_health, state.m_row
+        s_row, s_owner, s_health = state.s_row, state.s_owner, state.s_health
+        damage_f, damage_i, attack_range = self._damage_f, self._damage_i, self._attack_range
+
+        #Live mobile unit ids of each player grouped by tile, tiles in ascending order
+        occupied = ({}, {})
+        for uid in sorted(state.alive, key=m_tile.__getitem__):
+            if m_health[uid] > 0:
+                occupied[m_owner[uid]].setdefault(m_tile[uid], []).append(uid)
+
+        #Only structures covering an occupied tile can have a target this frame
+        threats = state.threats
+        reachable = set()
+        for tiles in occupied:
+            for tile in tiles:
+                tile_threats = threats.get(tile)
+                if tile_threats is None:
+                    tile_threats = threats[tile] = [attacker for attacker in state.attackers
+                                                    if tile in tile_set_in_range(attacker, attack_range[s_row[attacker]])]
+                reachable.update(tile_threats)
+        attackers = [(tile, s_row[tile], s_owner[tile], True) for tile in sorted(reachable) if s_row[tile] >= 0]
+        attackers += [(m_tile[uid], m_row[uid], m_owner[uid], False) for uid in state.alive if m_health[uid] > 0]
+
+        #Damage only lowers the health of the target it hits, so an identical attacker right after keeps the same
+        #target while it lives. Stacked units of one type are consecutive, so most of them skip the search.
+        last_attacker = None
+        target = None
+        target_mobile = False
+        hit = False
+        for attacker in attackers:
+            tile, row, owner, stationary = attacker
+            if attacker != last_attacker or \
+                    (target is not None and (m_health[target] if target_mobile else s_health[target]) <= 0):
+                last_attacker = attacker
+                target, target_mobile = self._get_target(state, tile, row, owner, stationary, occupied[1 - owner])
+            if target is None:
+                continue
+            hit = True
+            if target_mobile:
+                m_health[target] -= damage_i[row]
+            else:
+                s_health[target] -= damage_f[row]
+        return hit
+
+    def _skip_idle_frames(self, state, result):
+        if not state.alive:
+            return
+        m_timer, m_row, frames_per_move = state.m_timer, state.m_row, self._frames_per_move
+        timers = [m_timer[uid] for uid in state.alive if frames_per_move[m_row[uid]]]
+        #Units that never move keep the board as it is until the frame limit
+        skip = min(min(timers) - 1 if timers else self.max_frames, self.max_frames - result.frames)
+        if skip <= 0:
+            return
+        result.frames += skip
+        for uid in state.alive:
+            if frames_per_move[m_row[uid]]:
+                m_timer[uid] -= skip
+
+    def _get_target(self, state, tile, row, owner, stationary, enemy_tiles):
+        """Finds the target GameState.get_target would choose for a unit
+
+        Returns:
+            The unit id or structure tile index of the target, None if there is none, and whether it is a mobile unit
+
+        """
+        x, y = TILE_X[tile], TILE_Y[tile]
+        attack_range = self._attack_range[row]
+        if self._damage_i[row] > 0 and enemy_tiles:
+            target = self._mobile_target(x, y, owner, tile_set_in_range(tile, attack_range), enemy_tiles, state.m_health)
+            if target is not None:
+                return target, True
+        if stationary or self._damage_f[row] <= 0:
+            return None, False
+
+        candidates = state.structures_in_range.get((tile, row, owner))
+        if candidates is None:
+            s_row, s_owner = state.s_row, state.s_owner
+            candidates = state.structures_in_range[tile, row, owner] = [
+                candidate for candidate in tiles_in_range(tile, attack_range) if s_row[candidate] >= 0 and s_owner[candidate] != owner]
+        s_health = state.s_health
+        target = None
+        target_key = None
+        for candidate in candidates:
+            if s_health[candidate] <= 0:
+                continue
+            key = self._target_key(x, y, owner, candidate, s_health[candidate])
+            if target_key is None or key < target_key:
+                target, target_key = candidate, key
+        return target, False
+
+    def _mobile_target(self, x, y, owner, in_range, enemy_tiles, m_health):
+        target = None
+        target_key = None
+        for tile, ids in enemy_tiles.items():
+            if tile not in in_range:
+                continue
+            #Units sharing a tile only differ in health, so the first with the least health represents the tile
+            weakest = None
+            for uid in ids:
+                if m_health[uid] > 0 and (weakest is None or m_health[uid] < m_health[weakest]):
+                    weakest = uid
+            if weakest is None:
+                continue
+            key = self._target_key(x, y, owner, tile, m_health[weakest])
+            if target_key is None or key < target_key:
+                target, target_key = weakest, key
+        return target
+
+    def _target_key(self, x, y, owner, tile, health):
+        """Sort key matching GameState.get_target priorities among units of the same kind, lower is preferred
+        """
+        target_x, target_y = TILE_X[tile], TILE_Y[tile]
+        distance = DISTANCE[abs(x - target_x) * ARENA_SIZE + abs(y - target_y)]
+        height = target_y if owner == 0 else -target_y
+        return (distance, health, height, -abs(HALF_ARENA - 0.5 - target_x))
+
+    def _remove_dead(self, state, context, result):
+        destroyed = False
+        for tile in state.structures:
+            if state.s_health[tile] <= 0:
+                result.destroyed.append((self._unit_types[state.s_row[tile]], [TILE_X[tile], TILE_Y[tile]], state.s_owner[tile]))
+                state.s_row[tile] = -1
+                state.s_owner[tile] = -1
+                context.set_blocked([TILE_X[tile], TILE_Y[tile]], False)
+                destroyed = True
+        if destroyed:
+            state.structures = [tile for tile in state.structures if state.s_row[tile] >= 0]
+            state.attackers = [tile for tile in state.attackers if state.s_row[tile] >= 0]
+            state.supports = [tile for tile in state.supports if state.s_row[tile] >= 0]
+            state.structures_in_range.clear()
+        m_health = state.m_health
+        state.alive = [uid for uid in state.alive if m_health[uid] > 0]
+        return destroyed
+
+    def _refund_removals(self, state, result):
+        for tile in state.structures:
+            if not state.s_removing[tile]:
+                continue
+            row = state.s_row[tile]
+            health_fraction = min(1, state.s_health[tile] / self._max_health[row])
+            result.sp_delta[state.s_owner[tile]] += self._cost[row] * self._refund[row] * health_fraction
+
+
+# ActionPhaseSimulator for each (GameConfig, max_frames), so simulate only reads a config's stat tables once
+_simulators = {}
+_MAX_CACHED_SIMULATORS = 16
+
+
+def simulate(game_state, max_frames=1000):
+    """Simulates the action phase following game_state's pending turn. See ActionPhaseSimulator.simulate
+
+    Returns:
+        A SimulationResult
+
+    """
+    key = (game_state.game_config, max_frames)
+    simulator = _simulators.get(key)
+    if simulator is None:
+        if len(_simulators) >= _MAX_CACHED_SIMULATORS:
+            _simulators.clear()
+        simulator = _simulators[key] = ActionPhaseSimulator(game_state.game_config, max_frames)
+    return simulator.simulate(game_state)
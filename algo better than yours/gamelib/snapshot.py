@@ -0,0 +1,159 @@
+import json
+import struct
+
+from .game_state import GameState
+from .geometry import TILE_X, TILE_Y, IN_BOUNDS_INDICES
+
+# Turn number, then health, SP, MP and time for each player
+_HEADER = struct.Struct("<i8dH")
+# Tile index, flags, health
+_RECORD = struct.Struct("<HBd")
+
+_TYPE_BITS = 0x07
+_OWNER_BIT = 0x08
+_UPGRADED_BIT = 0x10
+_PENDING_REMOVAL_BIT = 0x20
+
+
+class BoardSnapshot:
+    """An immutable, compact binary copy of a GameState's units and player stats.
+
+    The bytes are a fixed header followed by one 11 byte record per unit, in tile order: the tile index,
+    a flags byte packing the unitInformation index, owner, upgraded and pending removal, and the health.
+    Health and stats are stored as 64 bit floats, so a rebuilt GameState holds exactly the same values
+    and worker processes decide like the master would. A typical board is around a kilobyte, pickles as
+    plain bytes, and compares and hashes by content, so it can be sent to worker processes or used as
+    a dictionary key.
+
+    Attributes :
+        * data (bytes): The packed snapshot
+
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        """Wraps packed snapshot bytes, for example received from another process
+
+        Args:
+            data: A bytes like object made by BoardSnapshot.from_game_state
+
+        """
+        self.data = bytes(data)
+
+    @classmethod
+    def from_game_state(cls, game_state):
+        """Packs the units on game_state's map and both players' stats
+
+        Args:
+            game_state: The GameState to copy
+
+        Returns:
+            A new BoardSnapshot
+
+        """
+        type_index = game_state.game_config.UNIT_TYPE_TO_INDEX
+        records = []
+        for index in IN_BOUNDS_INDICES:
+            for unit in game_state.game_map[TILE_X[index], TILE_Y[index]]:
+                flags = type_index[unit.unit_type]
+                if unit.player_index == 1:
+                    flags |= _OWNER_BIT
+                if unit.upgraded:
+                    flags |= _UPGRADED_BIT
+                if unit.pending_removal:
+                    flags |= _PENDING_REMOVAL_BIT
+                records.append(_RECORD.pack(index, flags, unit.health))
+
+        stats = []
+        for player_index, health, time in ((0, game_state.my_health, game_state.my_time), (1, game_state.enemy_health, game_state.enemy_time)):
+            stats += [health, game_state.get_resource(game_state.SP, player_index), game_state.get_resource(game_state.MP, player_index), time]
+        header = _HEADER.pack(game_state.turn_number, *stats, len(records))
+        return cls(header + b"".join(records))
+
+    @property
+    def turn_number(self):
+        """The turn number the snapshot was taken on
+        """
+        return _HEADER.unpack_from(self.data)[0]
+
+    def stats(self, player_index):
+        """Gets [health, SP, MP, time] of a player
+
+        Args:
+            player_index: The index corresponding to the player, 0 for you 1 for the enemy
+
+        """
+        return list(_HEADER.unpack_from(self.data)[1 + 4 * player_index:5 + 4 * player_index])
+
+    def __len__(self):
+        """The number of units in the snapshot
+        """
+        return _HEADER.unpack_from(self.data)[-1]
+
+    def records(self):
+        """A zero copy memoryview of the unit records, _RECORD.size bytes each
+        """
+        return memoryview(self.data)[_HEADER.size:]
+
+    def units(self):
+        """Yields (unitInformation index, [x, y], player_index, health, upgraded, pending_removal) for every unit,
+        read in place from the snapshot
+        """
+        view = memoryview(self.data)
+        for offset in range(_HEADER.size, len(view), _RECORD.size):
+            index, flags, health = _RECORD.unpack_from(view, offset)
+            yield (flags & _TYPE_BITS, [TILE_X[index], TILE_Y[index]], 1 if flags & _OWNER_BIT else 0,
+                   health, bool(flags & _UPGRADED_BIT), bool(flags & _PENDING_REMOVAL_BIT))
+
+    def to_serialized_string(self):
+        """Writes the snapshot in the game engine's turn state format, as read by GameState
+        """
+        return json.dumps(self.__to_state())
+
+    def __to_state(self):
+        players = []
+        for player_index in range(2):
+            #One list per unitInformation index, removals and upgrades after the six unit types
+            players.append([[] for _ in range(8)])
+        for unit_type, location, player_index, health, upgraded, pending_removal in self.units():
+            entry = [location[0], location[1], health, ""]
+            players[player_index][unit_type].append(entry)
+            if pending_removal:
+                players[player_index][6].append(entry)
+            if upgraded:
+                players[player_index][7].append(entry)
+        return {
+            "turnInfo": [0, self.turn_number, -1],
+            "p1Stats": self.stats(0),
+            "p2Stats": self.stats(1),
+            "p1Units": players[0],
+            "p2Units": players[1],
+            "events": {}
+        }
+
+    def to_game_state(self, config):
+        """Rebuilds a GameState holding the snapshot's units and stats
+
+        Args:
+            config (JSON): Contains information about the game
+
+        Returns:
+            A new GameState
+
+        """
+        state = self.__to_state()
+        return GameState(config, json.dumps(state), state)
+
+    def to_game_map(self, config):
+        """Rebuilds just the GameMap of the snapshot. See to_game_state
+        """
+        return self.to_game_state(config).game_map
+
+    def __eq__(self, other):
+        return isinstance(other, BoardSnapshot) and self.data == other.data
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __repr__(self):
+        return "BoardSnapshot(turn {}, {} units, {} bytes)".format(self.turn_number, len(self), len(self.data))
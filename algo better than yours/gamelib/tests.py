@@ -2,6 +2,14 @@ import unittest
 import json
 from .game_state import GameState
 from .unit import GameUnit
+from . import board_arrays
+from .simulator import simulate
+from .planner import TurnPlanner
+from .worker_pool import WorkerPool
+from .algocore import _turn_info
+from .game_config import GameConfig
+from . import geometry
+from .threat_map import ThreatMap
 
 class BasicTests(unittest.TestCase):
 
@@ -275,3 +283,458 @@ class BasicTests(unittest.TestCase):
         actual = game.project_future_MP(turns)
         self.assertAlmostEqual(actual, expected, 0, "Expected {} MP {} turns from now, got {}".format(expected, turns, actual))
 
+    def test_pathing(self):
+        game = self.make_turn_0_map()
+
+        path = game.find_path_to_edge([13, 0])
+        self.assertEqual([13, 0], path[0], "Paths should begin at the start location")
+        self.assertEqual([27, 14], path[-1], "An open board should path to the top right edge")
+        self.assertEqual(29, len(path), "Wrong path length on an open board")
+        self.assertEqual([[13, 0], [13, 1], [14, 1], [14, 2]], path[:4], "Units should alternate horizontal and vertical moves")
+
+        for x in range(10, 18):
+            game.game_map.add_unit("FF", [x, 3])
+        path = game.find_path_to_edge([13, 0])
+        self.assertEqual([16, 2], path[-1], "A sealed unit should path to its most ideal self destruct location")
+        self.assertEqual(None, game.find_path_to_edge([13, 3]), "We should not path from a blocked location")
+
+    def test_pathing_context(self):
+        game = self.make_turn_0_map()
+        context = game.get_pathing_context()
+        self.assertEqual(29, len(game.find_path_to_edge([13, 0])), "Wrong path length on an open board")
+
+        for x in range(10, 17):
+            game.attempt_spawn("FF", [x, 3])
+        self.assertIs(context, game.get_pathing_context(), "The pathing context should be reused between queries")
+        self.assertEqual(1, context.blocked[13 * 28 + 3], "Spawned structures should block the pathing context")
+        self.assertEqual([16, 2], game.find_path_to_edge([13, 0])[-1], "Spawned structures should seal the unit in")
+
+        game.game_map.remove_unit([16, 3])
+        self.assertEqual(0, context.blocked[16 * 28 + 3], "Removed structures should unblock the pathing context")
+        self.assertEqual(29, len(game.find_path_to_edge([13, 0])), "Removing a structure should reopen the path")
+
+    def test_find_paths_to_edges(self):
+        game = self.make_turn_0_map()
+        for x in range(10, 18):
+            game.game_map.add_unit("FF", [x, 3])
+        starts = game.game_map.get_edge_locations(game.game_map.BOTTOM_LEFT) + game.game_map.get_edge_locations(game.game_map.BOTTOM_RIGHT)
+        paths = game.find_paths_to_edges(starts)
+        self.assertEqual(28, len(paths), "We should get one path per start location")
+        for start, path in zip(starts, paths):
+            if game.contains_stationary_unit(start):
+                self.assertEqual(None, path, "Blocked starts should not have a path")
+            else:
+                self.assertEqual(game.find_path_to_edge(start), path, "Batched paths should match single paths")
+
+    def test_distance_field_cache(self):
+        from .navigation import ShortestPathFinder, DistanceFieldCache
+        cache = DistanceFieldCache(maxsize=2)
+        game = self.make_turn_0_map()
+        game._shortest_path_finder = ShortestPathFinder(cache)
+
+        path = game.find_path_to_edge([13, 0])
+        self.assertEqual((0, 1), (cache.hits, cache.misses), "The first query should search")
+        self.assertEqual(path, game.find_path_to_edge([13, 0]), "Cached fields should give the same path")
+        self.assertEqual((0, 1), (cache.hits, cache.misses), "Repeating a query should reuse the pathing context's field")
+
+        other = self.make_turn_0_map()
+        other._shortest_path_finder = ShortestPathFinder(cache)
+        other.find_path_to_edge([12, 1])
+        self.assertEqual((1, 1), (cache.hits, cache.misses), "Identical boards should share fields")
+
+        game.find_path_to_edge([14, 0])
+        game.find_path_to_edge([15, 1])
+        self.assertEqual(2, cache.stats()["size"], "The cache should be bounded")
+
+    def test_incremental_path_repair(self):
+        from .navigation import ShortestPathFinder, DistanceFieldCache
+        game = self.make_turn_0_map()
+        game._shortest_path_finder = ShortestPathFinder(DistanceFieldCache())
+        fresh = self.make_turn_0_map()
+        fresh._shortest_path_finder = ShortestPathFinder(DistanceFieldCache())
+        game.find_path_to_edge([13, 0])
+
+        for location in [[20, 8], [21, 8], [22, 9], [13, 1], [27, 14]]:
+            game.game_map.add_unit("FF", location)
+            fresh.game_map.add_unit("FF", location)
+            fresh.invalidate_pathing_context()
+            self.assertEqual(fresh.find_path_to_edge([13, 0]), game.find_path_to_edge([13, 0]), "Repaired paths should match fresh searches")
+        for location in [[21, 8], [13, 1], [27, 14]]:
+            game.game_map.remove_unit(location)
+            fresh.game_map.remove_unit(location)
+            fresh.invalidate_pathing_context()
+            self.assertEqual(fresh.find_path_to_edge([13, 0]), game.find_path_to_edge([13, 0]), "Repaired paths should match fresh searches")
+        self.assertEqual(1, game._shortest_path_finder.field_cache.misses, "Single tile changes should repair instead of searching")
+
+    def test_would_block_path(self):
+        game = self.make_turn_0_map()
+        for x in range(10, 16):
+            game.game_map.add_unit("FF", [x, 3])
+        self.assertEqual(True, game.would_block_path([16, 3], [[13, 0]]), "Filling the last gap should seal the unit in")
+        self.assertEqual(False, game.would_block_path([17, 3], [[13, 0]]), "A tile off the only route should not seal the unit in")
+        self.assertEqual(False, game.would_block_path([16, 3], [[13, 0], [3, 10]]), "Units outside the wall should still reach their edge")
+        self.assertEqual(True, game.would_block_path([13, 0], [[13, 0]]), "Building on the start should block it")
+
+        game.game_map.add_unit("FF", [16, 3])
+        self.assertEqual(True, game.would_block_path([20, 10], [[13, 0]]), "A sealed unit should stay sealed")
+
+    @unittest.skipIf(board_arrays.np is None, "numpy is not installed")
+    def test_board_arrays(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [13, 10], 0)
+        arrays = game.game_map.get_board_arrays()
+        self.assertEqual(2, arrays.structure_type[13, 10], "Existing structures should be copied into the arrays")
+
+        game.game_map.add_unit("FF", [12, 10], 0)
+        game.game_map.add_unit("DF", [14, 15], 1)
+        game.game_map.add_unit("EI", [13, 0], 0)
+        self.assertEqual(2, arrays.structure_count(0), "Mobile units are not structures")
+        self.assertEqual(1, arrays.structure_count(0, "FF"), "Wrong wall count")
+        self.assertEqual(3.0, arrays.structure_value(0), "Wrong SP on board")
+
+        damage = arrays.turret_damage(0)
+        for location in [[13, 13], [12, 12], [11, 10], [16, 10]]:
+            expected = sum(unit.damage_i for unit in game.get_attackers(location, 1))
+            self.assertEqual(expected, damage[location[0], location[1]], "Turret damage should match get_attackers at {}".format(location))
+
+        game.suppress_warnings(True)
+        game._player_resources[0]['SP'] = 100
+        game.attempt_upgrade([13, 10])
+        self.assertTrue(arrays.upgraded[13, 10], "Upgrades should be copied into the arrays")
+        self.assertEqual(15.0, arrays.turret_damage(0)[13, 13], "Upgraded turrets should use upgraded damage")
+        self.assertEqual(7.0, arrays.structure_value(0), "Upgrade costs count towards SP on board")
+
+        game.game_map.remove_unit([13, 10])
+        self.assertEqual(-1, arrays.owner[13, 10], "Removed structures should leave the arrays")
+
+    def test_threat_map(self):
+        game = self.make_turn_0_map()
+        game.suppress_warnings(True)
+        game.game_map.add_unit("DF", [12, 14], 1)
+        threat = game.get_threat_map()
+        game.game_map.add_unit("DF", [14, 15], 1)
+        game.game_map.add_unit("FF", [13, 15], 1)
+        game.game_map.add_unit("DF", [13, 10], 0)
+        game.attempt_spawn("DF", [14, 11])
+        game._player_resources[0]['SP'] = 100
+        game.attempt_upgrade([13, 10])
+
+        path = game.find_path_to_edge([13, 0])
+        expected = 0
+        for location in path:
+            attackers = game.get_attackers(location, 0)
+            expected += sum(unit.damage_i for unit in attackers)
+            self.assertEqual(sum(unit.damage_i for unit in attackers), threat.damage_at(location, 0), "Threat should match get_attackers at {}".format(location))
+        self.assertEqual(expected, threat.path_damage(path, 0), "Path damage should add up the path's tiles")
+        self.assertEqual(15.0 + 5.0, threat.damage_at([13, 12], 1), "Our upgraded turret should threaten the enemy")
+
+        game.game_map.remove_unit([12, 14])
+        self.assertEqual(5.0, threat.damage_at([13, 13], 0), "Removed turrets should stop threatening")
+
+    def test_estimate_path_damage(self):
+        game = self.make_turn_0_map()
+        #Unit stats are read from config once per config, so give the changed stats a config of their own
+        config = json.loads(json.dumps(game.config))
+        config["unitInformation"][1].update({"shieldPerUnit": 3.0, "shieldRange": 3.5, "shieldBonusPerY": 0.5})
+        game = GameState(config, game.serialized_string)
+        game.suppress_warnings(True)
+        estimate = game.estimate_path_damage([13, 0], "PI", 3)
+        self.assertEqual((0, 0, 3, True), (estimate["damage"], estimate["shield"], estimate["survivors"], estimate["reaches_edge"]), "An open board should be harmless")
+
+        game.game_map.add_unit("DF", [24, 14], 1)
+        estimate = game.estimate_path_damage([13, 0], "PI", 3)
+        threat = game.get_threat_map()
+        self.assertEqual(threat.path_damage(estimate["path"][:-1], 0), estimate["damage"], "Pings spend one frame per tile")
+        self.assertEqual(5.0 * 5, estimate["damage"], "The turret should hit the pings for five frames")
+        self.assertEqual(2, estimate["survivors"], "Twenty five damage should kill one fifteen health ping")
+
+        game.game_map.add_unit("EF", [25, 11], 0)
+        game.game_map.add_unit("EF", [7, 7], 0)
+        self.assertEqual(3.0 + 0.5 * 11, game.estimate_path_damage([13, 0], "PI")["shield"], "Only the support in range should shield the path")
+
+        self.assertEqual(4 * estimate["damage"], game.estimate_path_damage([13, 0], "SI", 1)["damage"], "Scramblers spend four frames per tile")
+        self.assertEqual(None, game.estimate_path_damage([13, 0], "FF"), "Structures cannot walk paths")
+
+    def test_simulator(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("PI", [13, 0], 3)
+        result = simulate(game)
+        self.assertEqual(([0, -3], [3, 0], [-3, 0]), (result.health_delta, result.sp_delta, result.mp_delta), "Every ping should score on an open board")
+
+        game.game_map.add_unit("DF", [24, 14], 1)
+        result = simulate(game)
+        self.assertEqual(2, len(result.breaches), "The turret should kill one ping like estimate_path_damage predicts")
+        self.assertEqual(90, game.game_map[24, 14][0].health, "Simulating should not change the game state")
+
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("FF", [14, 4], 1)
+        game.attempt_spawn("PI", [13, 0], 10)
+        self.assertEqual([("FF", [14, 4], 1)], simulate(game).destroyed, "Ten pings should shoot down a wall next to their path")
+
+        game = self.make_turn_0_map()
+        game.attempt_spawn("FF", [14, 2])
+        game.attempt_remove([[14, 2]])
+        game.attempt_spawn("PI", [13, 0])
+        self.assertEqual([0.75, 0], simulate(game).sp_delta, "Builds should cost SP, removals refund it and breaches reward it")
+
+    def test_planner(self):
+        game = self.make_turn_0_map()
+        planner = TurnPlanner(game.config, seed=0)
+        plan = planner.plan(game, budget=0)
+        self.assertEqual((0, None, []), (planner.evaluated, plan.score, plan.deploys), "A spent budget should return the fallback plan at once")
+
+        game.game_map.add_unit("DF", [24, 14], 1)
+        build_sets = [[], [["FF", [13, 2], False]]]
+        plan = planner.plan(game, build_sets, budget=0.5)
+        self.assertTrue(planner.evaluated > 1, "Candidates should be simulated")
+        self.assertEqual(15, plan.score, "All five pings should score while avoiding the turret")
+        self.assertEqual([], game._deploy_stack, "Planning should not spend anything on the real turn")
+
+        plan.apply(game)
+        self.assertEqual(5, len(game._deploy_stack), "Applying the plan should attempt its deploys")
+
+    def test_worker_pool(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [24, 14], 1)
+        pool = WorkerPool(game.config, 2, seed=0)
+        try:
+            plan = pool.plan(game, [[], [["FF", [13, 2], False]]], budget=0.5)
+            self.assertTrue(pool.evaluated > 1, "The workers should simulate candidates")
+            self.assertEqual(15, plan.score, "The workers should find the same best plan as a single planner")
+        finally:
+            pool.close()
+
+    def test_snapshot(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("DF", [3, 12])
+        game.attempt_upgrade([3, 12])
+        game.game_map.add_unit("FF", [13, 20], 1)
+        game.game_map[13, 20][0].health = 20.5
+        game.attempt_spawn("FF", [4, 12])
+        game.attempt_remove([4, 12])
+        game.game_map[4, 12][0].pending_removal = True
+        game.attempt_spawn("PI", [13, 0], 2)
+
+        snapshot = game.snapshot()
+        self.assertEqual(5, len(snapshot), "Every unit should get a record")
+        self.assertEqual(len(snapshot) * 11, len(snapshot.records()), "Records should be packed")
+        self.assertEqual([30, 25 - 2 - 4 - 1, 5 - 2, 0], snapshot.stats(0), "Stats should reflect spending")
+
+        rebuilt = snapshot.to_game_state(game.config)
+        self.assertEqual(snapshot, rebuilt.snapshot(), "Rebuilding should round trip")
+        self.assertEqual({snapshot: 1}[rebuilt.snapshot()], 1, "Equal snapshots should hash the same")
+        self.assertTrue(rebuilt.game_map[3, 12][0].upgraded, "Upgrades should survive")
+        self.assertTrue(rebuilt.game_map[4, 12][0].pending_removal, "Removals should survive")
+        self.assertEqual(20.5, rebuilt.game_map[13, 20][0].health, "Health should survive")
+        game._player_resources[0]['SP'] = 13.7
+        self.assertEqual(13.7, game.snapshot().to_game_state(game.config).get_resource(game.SP), "Resources should survive exactly")
+        self.assertEqual(2, len(rebuilt.game_map[13, 0]), "Stacked mobile units should survive")
+
+        game.game_map[13, 20][0].health = 20
+        self.assertNotEqual(snapshot, game.snapshot(), "Any change should give a different snapshot")
+
+    def test_zobrist_hash(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        self.assertEqual(0, game_map.zobrist_hash, "An empty board should hash to zero")
+
+        game_map.add_unit("FF", [3, 12], 0)
+        game_map.add_unit("DF", [13, 20], 1)
+        board_hash = game_map.zobrist_hash
+        game_map.add_unit("PI", [13, 0], 0)
+        self.assertEqual(board_hash, game_map.zobrist_hash, "Mobile units should not change the hash")
+
+        game.attempt_upgrade([3, 12])
+        self.assertNotEqual(board_hash, game_map.zobrist_hash, "Upgrades should change the hash")
+        game_map.remove_unit([3, 12])
+        game_map.add_unit("FF", [3, 12], 0)
+        self.assertEqual(board_hash, game_map.zobrist_hash, "Restoring the board should restore the hash")
+
+        other = self.make_turn_0_map().game_map
+        other.add_unit("DF", [13, 20], 1)
+        other[3, 12] = [GameUnit("FF", game.config, 0, None, 3, 12)]
+        self.assertEqual(board_hash, other.zobrist_hash, "The hash should not depend on the order units were added")
+
+        game.attempt_upgrade([3, 12])
+        rebuilt = game.snapshot().to_game_state(game.config)
+        self.assertEqual(game_map.zobrist_hash, rebuilt.game_map.zobrist_hash, "Parsed boards should hash like built ones")
+
+    def test_fork(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("DF", [3, 12])
+        game.game_map.add_unit("FF", [13, 20], 1)
+        board_hash = game.game_map.zobrist_hash
+
+        fork = game.fork()
+        fork.attempt_upgrade([3, 12])
+        fork.attempt_spawn("FF", [4, 12])
+        fork.attempt_spawn("PI", [13, 0], 2)
+        fork.attempt_remove([3, 12])
+        fork.game_map.remove_unit([13, 20])
+
+        self.assertFalse(game.game_map[3, 12][0].upgraded, "Upgrading on a fork should not touch the parent's unit")
+        self.assertEqual(([], [], [], 1), (game.game_map[4, 12], game.game_map[13, 0], game._deploy_stack, len(game.game_map[13, 20])), "The parent's board should be unchanged")
+        self.assertEqual([("DF", 3, 12)], game._build_stack, "The parent's build stack should be unchanged")
+        self.assertEqual(23, game.get_resource(game.SP), "The parent's resources should be unchanged")
+        self.assertEqual(board_hash, game.game_map.zobrist_hash, "The parent's hash should be unchanged")
+
+        self.assertTrue(fork.game_map[3, 12][0].upgraded, "The fork should see its own upgrade")
+        self.assertEqual((23 - 4 - 1, 3), (fork.get_resource(fork.SP), fork.get_resource(fork.MP)), "The fork should spend its own resources")
+        self.assertEqual(4, len(fork._build_stack), "The fork should keep its own build stack")
+
+        game.attempt_spawn("FF", [5, 12])
+        self.assertEqual([], fork.game_map[5, 12], "Changes to the parent after forking should not reach the fork")
+        self.assertEqual(fork.game_map.zobrist_hash, fork.fork().game_map.zobrist_hash, "Forks of forks should carry the hash")
+
+    def test_checkpoint(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("DF", [3, 12])
+        threat_map = game.get_threat_map()
+        threat = threat_map.damage_at([3, 13], 1)
+        board_hash = game.game_map.zobrist_hash
+
+        checkpoint = game.checkpoint()
+        game.attempt_upgrade([3, 12])
+        game.attempt_spawn("FF", [4, 12])
+        game.attempt_spawn("PI", [13, 0], 2)
+        inner = game.checkpoint()
+        game.game_map.remove_unit([3, 12])
+        game.rollback(inner)
+        self.assertEqual(1, len(game.game_map[3, 12]), "Rolling back to the inner checkpoint should restore the removed unit")
+        self.assertTrue(game.game_map[3, 12][0].upgraded, "Changes before the inner checkpoint should stay")
+
+        game.rollback(checkpoint)
+        self.assertFalse(game.game_map[3, 12][0].upgraded, "The upgrade should be undone")
+        self.assertEqual(([], [], [], [("DF", 3, 12)]), (game.game_map[4, 12], game.game_map[13, 0], game._deploy_stack, game._build_stack), "Spawns should be undone")
+        self.assertEqual((23, 5), (game.get_resource(game.SP), game.get_resource(game.MP)), "Resources should be restored")
+        self.assertEqual(board_hash, game.game_map.zobrist_hash, "The hash should be restored")
+        self.assertEqual(threat, threat_map.damage_at([3, 13], 1), "Listeners should see the restored tiles")
+
+        game.attempt_spawn("FF", [5, 12])
+        game.release(checkpoint)
+        self.assertEqual("FF", game.game_map[5, 12][0].unit_type, "Releasing a checkpoint should keep the changes since")
+
+    def test_lazy_parse(self):
+        game = self.make_turn_0_map()
+        game.game_map.add_unit("DF", [3, 12], 0)
+        game.game_map[3, 12][0].upgrade()
+        game.game_map.update_tile([3, 12])
+        game.game_map.add_unit("FF", [13, 20], 1)
+        game.game_map[3, 12][0].pending_removal = True
+        game.game_map.add_unit("PI", [13, 0], 0)
+        game.game_map.add_unit("PI", [13, 0], 0)
+        serialized = game.snapshot().to_serialized_string()
+
+        parsed = GameState(game.config, serialized, json.loads(serialized))
+        self.assertEqual(game.game_map.zobrist_hash, parsed.game_map.zobrist_hash, "The hash should be set before any unit is built")
+        fork = parsed.fork()
+        turret = parsed.game_map[3, 12][0]
+        self.assertEqual((True, True, "DF"), (turret.upgraded, turret.pending_removal, turret.unit_type), "Upgrades and removals should be applied when the tile is read")
+        self.assertEqual(game.game_map[3, 12][0].damage_f, turret.damage_f, "Upgraded units should have upgraded stats")
+        self.assertEqual(2, len(parsed.game_map[13, 0]), "Every mobile unit on a tile should be built")
+        self.assertEqual("FF", fork.game_map[13, 20][0].unit_type, "Forks should see units not yet read on the parent")
+        self.assertEqual([base + upgrade for base, upgrade in zip(game.type_cost("DF"), game.type_cost("DF", True))], turret.cost, "Upgraded cost should include the upgrade")
+
+    def test_turn_info(self):
+        frame = """{"p2Units":[[],[],[],[],[],[],[]],"turnInfo":[1,5,23],"p1Stats":[30.0,25.0,5.0,0],"events":{"spawn":[[[13,0],3,"1",1]]}}"""
+        self.assertEqual([1, 5, 23], _turn_info(frame), "turnInfo should be read without decoding the message")
+        self.assertEqual([0, 2, -1], _turn_info("""{"turnInfo": [ 0.0, 2, -1 ]}"""), "Other number formats should still be read")
+        self.assertEqual(None, _turn_info("""{"p1Stats":[30.0,25.0,5.0,0]}"""), "Messages without turnInfo should give None")
+
+    def test_game_config(self):
+        game = self.make_turn_0_map()
+        config = json.loads(json.dumps(game.config))
+        config["unitInformation"][2]["attackDamageWalker"] = 100
+        variant = GameState(config, game.serialized_string)
+        game.game_map.add_unit("DF", [3, 12], 0)
+        variant.game_map.add_unit("DF", [3, 12], 0)
+
+        self.assertIs(game.game_config, GameState(game.config, game.serialized_string).game_config, "States of one config should share its GameConfig")
+        self.assertIs(game.game_config, game.game_map.game_config, "The map should share the state's GameConfig")
+        self.assertEqual(100, variant.game_map[3, 12][0].damage_i, "Each config should keep its own stats")
+        self.assertNotEqual(100, game.game_map[3, 12][0].damage_i, "A second config should not change the first")
+        self.assertEqual(("FF", "EF", "DF"), game.STRUCTURE_TYPES, "Constants should be read from the config")
+        with self.assertRaises(AttributeError):
+            game.game_config.WALL = "DF"
+
+    def test_geometry(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        bounds = [[x, y] for x in range(28) for y in range(28) if geometry.in_arena_bounds(x, y)]
+
+        self.assertEqual(len(bounds), len(geometry.IN_BOUNDS_INDICES), "The mask and the formula should agree")
+        self.assertEqual(420, len(bounds), "The arena should have 420 tiles")
+        self.assertFalse(game_map.in_arena_bounds([0, 0]), "Corners should be out of bounds")
+        self.assertTrue(game_map.in_arena_bounds([13.5, 0]), "Float locations should still be checked")
+        self.assertEqual([13, 27], game_map.get_edge_locations(game_map.TOP_LEFT)[0], "Edges should keep their order")
+        self.assertTrue(all(len(edge) == 14 for edge in game_map.get_edges()), "Each edge should have 14 tiles")
+        self.assertIn([13, 14], game_map.get_locations_in_range([13, 13], 1), "Range should include neighbors")
+        self.assertEqual(geometry.location_to_index([5, 9]), geometry.tiles_in_range(geometry.location_to_index([5, 9]), 0.5)[0], "A tile should be in its own range")
+        self.assertTrue(game.can_spawn("PI", [0, 13]), "Edges should be deployable")
+
+    def test_structure_index(self):
+        game = self.make_turn_0_map()
+        game_map = game.game_map
+        game_map.add_unit("FF", [13, 10], 0)
+        game_map.add_unit("DF", [3, 12], 0)
+        game_map.add_unit("EF", [14, 20], 1)
+        game_map.add_unit("PI", [13, 0], 0)
+        checkpoint = game_map.checkpoint()
+        game_map.remove_unit([13, 10])
+        game_map.add_unit("FF", [12, 10], 1)
+
+        self.assertEqual([[12, 10], [3, 12], [14, 20]], game_map.get_structure_locations(), "Structures should come row by row")
+        self.assertEqual({14 * 28 + 20, 12 * 28 + 10}, game_map.get_structure_indices(1), "Each player should have their own structures")
+        self.assertEqual({13 * 28}, game_map.get_mobile_indices(), "Mobile units should be indexed apart from structures")
+        game_map.remove_unit([13, 0])
+        self.assertEqual(set(), game_map.get_mobile_indices(), "Removing a mobile unit should clear its index")
+        game_map.rollback(checkpoint)
+        self.assertEqual({13 * 28}, game_map.get_mobile_indices(), "Rollback should restore the mobile index")
+        self.assertEqual([[13, 10], [3, 12], [14, 20]], game_map.get_structure_locations(), "Rollback should restore the index")
+        fork = game_map.fork()
+        fork.remove_unit([14, 20])
+        self.assertEqual(3, len(game_map.get_structure_indices()), "Forks should keep their own index")
+        self.assertEqual([location for location in game_map if game.contains_stationary_unit(location)], game_map.get_structure_locations(), "The index should match a full scan")
+        iterator = iter(game_map)
+        next(iterator)
+        self.assertEqual(420, len(list(game_map)), "Every tile should be iterated")
+        self.assertEqual([14, 0], next(iterator), "Iterating should be reentrant")
+
+    def test_apply_build_plan(self):
+        game = self.make_turn_0_map()
+        game.suppress_warnings(True)
+        plan = [["DF", [3, 12], True], ["DF", [3, 12], False], ["FF", [13, 20], False], ["PI", [13, 0], False], ["FF", [14, 1], True]]
+        expected = game.fork()
+        for unit_type, location, upgrade in plan:
+            expected.attempt_spawn(unit_type, location)
+            if upgrade:
+                expected.attempt_upgrade(location)
+
+        results = game.apply_build_plan(plan)
+        self.assertEqual([[True, True], [False, False], [False, False], [True, False], [True, True]], results, "Each entry should report what it did")
+        self.assertEqual(expected._build_stack, game._build_stack, "The plan should build like attempt_spawn and attempt_upgrade")
+        self.assertEqual(expected._deploy_stack, game._deploy_stack, "Mobile entries should be deployed")
+        self.assertEqual(expected.get_resources(), game.get_resources(), "The plan should spend the same resources")
+
+    def test_game_config_shared_constants(self):
+        game = self.make_turn_0_map()
+        other = GameState(game.config, game.serialized_string)
+        game_config = GameConfig.get(game.config)
+        game.game_map.add_unit("EF", [13, 10], 0)
+        other.game_map.add_unit("EF", [13, 10], 0)
+
+        self.assertIs(game_config, game.game_config, "A state should use the config's GameConfig")
+        self.assertIs(game_config, other.game_config, "Two states of one config should share a GameConfig")
+        self.assertEqual((game_config.WALL, game_config.SUPPORT, game_config.TURRET), (other.WALL, other.SUPPORT, other.TURRET), "Unit constants should come from the GameConfig")
+        self.assertIs(game.game_map[13, 10][0].spec, other.game_map[13, 10][0].spec, "Units of both states should share one UnitSpec")
+
+    def test_threat_map_invalidate(self):
+        game = self.make_turn_0_map()
+        for _ in range(3):
+            game.get_threat_map()
+            game.invalidate_pathing_context()
+        threat = game.get_threat_map()
+        listeners = game.game_map._GameMap__listeners
+
+        self.assertEqual(1, sum(isinstance(listener, ThreatMap) for listener in listeners), "Invalidating should unregister the old threat map")
+        self.assertIn(threat, listeners, "The current threat map should stay registered")
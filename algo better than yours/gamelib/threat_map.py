@@ -0,0 +1,116 @@
+from array import array
+
+from .geometry import ARENA_SIZE, NUM_TILES, location_to_index, tiles_in_range
+
+class ThreatMap:
+    """Damage per frame that structures deal to mobile units on every tile of the board.
+
+    GameState.get_threat_map builds one per turn and registers it as a listener on the GameMap,
+    so add_unit, remove_unit, item assignment and update_tile only redo the tiles covered by the changed structure.
+
+    Supports are tracked the same way, so the shielding a unit picks up along a path is also a lookup.
+
+    Attributes :
+        * damage (list): damage[p] is an array with, for every tile index, the total damage per frame
+          that player p's structures deal to an enemy mobile unit standing there
+        * shielders (list): shielders[p] maps a tile index to the tile indices of player p's supports in range of it
+
+    """
+    def __init__(self, game_map):
+        """Adds up the threat of every structure on game_map
+
+        Args:
+            game_map: The GameMap to read structures from
+
+        """
+        self.damage = [array('d', [0.0]) * NUM_TILES, array('d', [0.0]) * NUM_TILES]
+        self.shielders = [{}, {}]
+        # (owner, damage, covered tile indices) of the armed structure on each tile
+        self._sources = {}
+        # (owner, shield per unit, covered tile indices) of the support on each tile
+        self._supports = {}
+        for index in sorted(game_map.get_structure_indices()):
+            x, y = divmod(index, ARENA_SIZE)
+            self.tile_changed(x, y, game_map[x, y])
+
+    def tile_changed(self, x, y, units):
+        """GameMap listener callback, swaps out the threat of the structure at [x, y]
+        """
+        index = x * ARENA_SIZE + y
+        source = self._sources.pop(index, None)
+        if source is not None:
+            owner, damage, tiles = source
+            owner_damage = self.damage[owner]
+            for tile in tiles:
+                owner_damage[tile] -= damage
+
+        support = self._supports.pop(index, None)
+        if support is not None:
+            owner, shield, tiles = support
+            owner_shielders = self.shielders[owner]
+            for tile in tiles:
+                owner_shielders[tile].discard(index)
+
+        for unit in units:
+            if not unit.stationary or unit.player_index not in (0, 1):
+                continue
+            if unit.damage_i > 0:
+                tiles = tiles_in_range(index, unit.attackRange, True)
+                owner_damage = self.damage[unit.player_index]
+                for tile in tiles:
+                    owner_damage[tile] += unit.damage_i
+                self._sources[index] = (unit.player_index, unit.damage_i, tiles)
+            if unit.shieldPerUnit > 0 and unit.shieldRange > 0:
+                tiles = tiles_in_range(index, unit.shieldRange, True)
+                owner_shielders = self.shielders[unit.player_index]
+                for tile in tiles:
+                    owner_shielders.setdefault(tile, set()).add(index)
+                #Supports further up their own half give a bonus, measured from the owner's edge
+                distance_from_edge = y if unit.player_index == 0 else ARENA_SIZE - 1 - y
+                shield = unit.shieldPerUnit + unit.shieldBonusPerY * distance_from_edge
+                self._supports[index] = (unit.player_index, shield, tiles)
+            break
+
+    def damage_at(self, location, player_index):
+        """Gets the damage per frame a mobile unit would take at a location
+
+        Args:
+            location: The location of a hypothetical mobile unit
+            player_index: The player controlling that unit, 0 for you 1 for the enemy
+
+        Returns:
+            The total damage per frame of the opposing player's structures in range of the location
+
+        """
+        return self.damage[1 - player_index][location_to_index(location)]
+
+    def path_damage(self, path, player_index):
+        """Adds up damage_at over every location of a path, one frame per tile
+
+        Args:
+            path: A list of locations, for example from GameState.find_path_to_edge
+            player_index: The player controlling the unit walking the path
+
+        Returns:
+            The summed damage per frame over the path
+
+        """
+        damage = self.damage[1 - player_index]
+        return sum(damage[location_to_index(location)] for location in path)
+
+    def path_shielding(self, path, player_index):
+        """Gets the shield a single mobile unit picks up walking a path. Each support shields a unit once.
+
+        Args:
+            path: A list of locations, for example from GameState.find_path_to_edge
+            player_index: The player controlling the unit walking the path
+
+        Returns:
+            The total shield given by the player's supports in range of any tile of the path
+
+        """
+        owner_shielders = self.shielders[player_index]
+        supports = set()
+        for location in path:
+            supports.update(owner_shielders.get(location_to_index(location), ()))
+        return sum(self._supports[index][1] for index in supports)
@@ -1,3 +1,6 @@
+from .game_config import GameConfig
+
+
 def is_stationary(unit_type, structure_types):
     """
         Args:
@@ -13,8 +16,10 @@ class GameUnit:
     """Holds information about a Unit. 
 
     Attributes :
+        * spec (UnitSpec): The stats of this unit's type, shared with every unit of the type. unit_type, upgraded and the
+          stats from stationary to shieldBonusPerY are copied from it into the unit's own slots on creation and upgrade,
+          since plain attributes read several times faster than properties in the pathing, targeting and simulator loops
         * unit_type (string): This unit's type
-        * config (JSON): Contains information about the game
         * player_index (integer): The player that controls this unit. 0 for you, 1 for your opponent.
         * x (integer): The x coordinate of the unit
         * y (integer): The y coordinate of the unit
@@ -28,50 +33,41 @@ class GameUnit:
         * health (float): The current health of this unit
         * cost ([int, int]): The resource costs of this unit first is SP second is MP
         * shieldPerUnit (float): how much shield is given per unit
+        * shieldBonusPerY (float): how much extra shield is given per row this unit is from its owner's edge
         * pending_removal (boolean): If this unit is marked for removal by its owner
         * upgraded (boolean): If this unit is upgraded
 
     """
+    __slots__ = ("spec", "unit_type", "upgraded", "stationary", "speed", "damage_f", "damage_i", "attackRange", "shieldRange",
+                 "max_health", "shieldPerUnit", "shieldBonusPerY", "player_index", "health", "x", "y", "pending_removal")
+
     def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1):
         """ Initialize unit variables using args passed
 
+        Args:
+            config: The config JSON of the game, or its GameConfig
+
         """
-        self.unit_type = unit_type
-        self.config = config
+        spec = self.spec = GameConfig.get(config).unit_specs[unit_type]
+        #Plain attributes read much faster than properties, so the stats are copied in one unpack
+        (self.unit_type, _, self.upgraded, self.stationary, self.speed, self.damage_f, self.damage_i, self.attackRange,
+         self.shieldRange, self.max_health, self.shieldPerUnit, self.shieldBonusPerY, _, _) = spec
         self.player_index = player_index
         self.pending_removal = False
-        self.upgraded = False
         self.x = x
         self.y = y
-        self.__serialize_type()
-        self.health = self.max_health if not health else health
-
-    def __serialize_type(self):
-        from .game_state import STRUCTURE_TYPES, UNIT_TYPE_TO_INDEX, SUPPORT
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]]
-        self.stationary = type_config["unitCategory"] == 0
-        self.speed = type_config.get("speed", 0)
-        self.damage_f = type_config.get("attackDamageTower", 0)
-        self.damage_i = type_config.get("attackDamageWalker", 0)
-        self.attackRange = type_config.get("attackRange", 0)
-        self.shieldRange = type_config.get("shieldRange", 0)
-        self.max_health = type_config.get("startHealth", 0)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", 0)
-        self.cost = [type_config.get("cost1", 0), type_config.get("cost2", 0)]
+        self.health = spec.max_health if not health else health
 
+    @property
+    def cost(self):
+        return list(self.spec.cost)
 
     def upgrade(self):
-        from .game_state import UNIT_TYPE_TO_INDEX
-        type_config = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[self.unit_type]].get("upgrade", {})
-        self.speed = type_config.get("speed", self.speed)
-        self.damage_f = type_config.get("attackDamageTower", self.damage_f)
-        self.damage_i = type_config.get("attackDamageWalker", self.damage_i)
-        self.attackRange = type_config.get("attackRange", self.attackRange)
-        self.shieldRange = type_config.get("shieldRange", self.shieldRange)
-        self.max_health = type_config.get("startHealth", self.max_health)
-        self.shieldPerUnit = type_config.get("shieldPerUnit", self.shieldPerUnit)
-        self.cost = [type_config.get("cost1", 0) + self.cost[0], type_config.get("cost2", 0) + self.cost[1]]
-        self.upgraded = True
+        spec = self.spec.upgrade
+        if spec is not None:
+            self.spec = spec
+            (self.unit_type, _, self.upgraded, self.stationary, self.speed, self.damage_f, self.damage_i, self.attackRange,
+             self.shieldRange, self.max_health, self.shieldPerUnit, self.shieldBonusPerY, _, _) = spec
 
 
     def __toString(self):
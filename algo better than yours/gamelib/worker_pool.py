@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import time
+
+from .game_state import GameState
+from .planner import TurnPlanner, TurnPlan
+from .simulator import ActionPhaseSimulator
+from .snapshot import BoardSnapshot
+
+# The planner of a worker process, created once by _init_worker
+_worker_planner = None
+
+
+def _init_worker(config, planner_options):
+    global _worker_planner
+    _worker_planner = TurnPlanner(config, **planner_options)
+
+
+def _plan_shard(snapshot_data, build_sets, spawn_points, deadline, seed):
+    """Runs in a worker process, planning with only some of the spawn points until a time.time() deadline,
+    so time spent queued or unpacking the snapshot counts against the budget
+
+    Returns:
+        The best TurnPlan for the shard and the number of candidates simulated, None and 0 if the deadline had passed
+
+    """
+    if time.time() >= deadline:
+        return None, 0
+    game_state = BoardSnapshot(snapshot_data).to_game_state(_worker_planner.config)
+    game_state.suppress_warnings(True)
+    plan = _worker_planner.plan(game_state, build_sets, deadline - time.time(), spawn_points, deadline, seed)
+    return plan, _worker_planner.evaluated
+
+
+class WorkerPool:
+    """Worker processes that split a TurnPlanner search between them, started once per game.
+
+    AlgoCore.start creates one after on_game_start when worker_processes is set. The simulator's range
+    tables are filled before forking, so every worker starts with them and a TurnPlanner ready to go.
+    Each turn only a BoardSnapshot of the turn, the build sets and a share of the spawn points travel to
+    each worker, and only its best plan comes back.
+
+    Attributes :
+        * processes (int): The number of worker processes
+        * evaluated (int): The number of candidates simulated across all workers by the last call to plan
+
+    """
+    # Seconds held back from the budget for sending work out and collecting the plans
+    MARGIN = 0.05
+
+    def __init__(self, config, processes=None, **planner_options):
+        """Starts the worker processes
+
+        Args:
+            config (JSON): Contains information about the game
+            processes: The number of workers, one per CPU if None
+            planner_options: Keyword arguments for each worker's TurnPlanner
+
+        """
+        self.config = config
+        self.processes = processes or os.cpu_count() or 1
+        self.evaluated = 0
+        self._planner = TurnPlanner(config, **planner_options)
+        ActionPhaseSimulator(config).precompute()
+
+        #Forked workers inherit the filled tables, other platforms build them again as needed
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            context = multiprocessing.get_context()
+        self._pool = context.Pool(self.processes, initializer=_init_worker, initargs=(config, planner_options))
+
+    def plan(self, game_state, build_sets=None, budget=1.0):
+        """Plans the turn like TurnPlanner.plan, with each worker searching from a share of the spawn points
+
+        Args:
+            game_state: The GameState of the current turn
+            build_sets: A list of build orders, each a list of [unit_type, [x, y], upgrade] entries
+            budget: Seconds to search for. Plans that are not back in time are ignored
+
+        Returns:
+            The best TurnPlan any worker found
+
+        """
+        deadline = time.perf_counter() + budget
+        #Workers stop by the same wall clock time wherever they are in the queue
+        worker_deadline = time.time() + max(0, budget - self.MARGIN)
+        build_sets = build_sets or [[]]
+        spawn_points = self._planner.get_spawn_points(game_state)
+        #Like TurnPlanner.plan, plan from the state at the start of the turn
+        snapshot = GameState(game_state.config, game_state.serialized_string, game_state._state).snapshot()
+        pending = []
+        for worker in range(min(self.processes, len(spawn_points)) or 1):
+            shard = spawn_points[worker::self.processes]
+            pending.append(self._pool.apply_async(_plan_shard, (snapshot.data, build_sets, shard, worker_deadline, worker)))
+
+        best = TurnPlan(0, build_sets[0], [])
+        self.evaluated = 0
+        for result in pending:
+            try:
+                plan, evaluated = result.get(max(0, deadline - time.perf_counter()))
+            except multiprocessing.TimeoutError:
+                continue
+            self.evaluated += evaluated
+            if plan is not None and plan.score is not None and (best.score is None or plan.score > best.score):
+                best = plan
+        return best
+
+    def close(self):
+        """Stops the worker processes
+        """
+        self._pool.terminate()
+        self._pool.join()